@@ -0,0 +1,40 @@
+# Class discovery (GetControlClass with includeInherited) cold vs warm.
+# Run from the repository root: python -m benchmarks.bench_class_discovery
+from benchmarks.common import time_per_call
+from data_types import ElementId
+from nc_block import NcBlock
+from nc_class_manager import NcClassManager
+from nc_device_manager import NcDeviceManager
+from nc_manager import NcManager
+from nc_object import NcObject
+from nc_worker import NcWorker
+
+CLASSES = [NcObject, NcBlock, NcWorker, NcManager, NcDeviceManager, NcClassManager]
+REPEAT = 2_000
+
+
+def rebuild():
+    # What every discovery request used to cost
+    for cls in CLASSES:
+        cls.get_class_descriptor(True).to_dict()
+
+
+def main():
+    cold = time_per_call(lambda: NcClassManager(None, 3, True, 1), 200)
+    class_manager = NcClassManager(None, 3, True, 1)
+    args = [
+        {"classId": cls.get_class_descriptor(False).classId, "includeInherited": True}
+        for cls in CLASSES
+    ]
+    method_id = ElementId(3, 1)
+    warm = time_per_call(
+        lambda: [class_manager.invoke_method(3, method_id, a) for a in args], REPEAT
+    )
+    rebuilt = time_per_call(rebuild, REPEAT)
+    print(f"class manager construction (cold):   {cold * 1e6:10.1f} us")
+    print(f"discovery of {len(CLASSES)} classes, rebuilt:  {rebuilt * 1e6:10.1f} us")
+    print(f"discovery of {len(CLASSES)} classes, cached:   {warm * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
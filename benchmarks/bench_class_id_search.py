@@ -0,0 +1,65 @@
+# FindMembersByClassId (2m4) from the class id tries versus the previous
+# scan comparing dotted class id strings, recursing from the root.
+# Run from the repository root: python -m benchmarks.bench_class_id_search
+import asyncio
+from functools import partial
+
+from benchmarks.common import build_block_tree, time_per_call
+from nc_block import NcBlock
+
+SIZES = (1_000, 10_000, 100_000)
+SEARCHES = (
+    ("blocks, exact", [1, 1], False),
+    ("workers, exact", [1, 2], False),
+    ("all derived from 1", [1], True),
+)
+
+
+def scan_class_id(block, class_id, include_derived):
+    # The previous NcBlock.find_members_by_class_id, kept here for comparison
+    class_id_str = ".".join(str(x) for x in class_id)
+
+    def matches_class_id(cid):
+        cid_str = ".".join(str(x) for x in cid)
+        return (
+            cid_str.startswith(class_id_str)
+            if include_derived
+            else cid_str == class_id_str
+        )
+
+    results = [
+        block.make_member_descriptor(m, block.get_oid())
+        for m in block.members
+        if matches_class_id(m.get_class_id())
+    ]
+    for m in block.members:
+        if isinstance(m, NcBlock):
+            results.extend(scan_class_id(m, class_id, include_derived))
+    return results
+
+
+async def main():
+    print(f"{'members':>8} {'search':>20} {'found':>7} {'trie us':>10} {'scan us':>10}")
+    for size in SIZES:
+        root, _ = build_block_tree(asyncio.Queue(), size, fanout=4, depth=3)
+        await asyncio.sleep(0)
+        for label, class_id, include_derived in SEARCHES:
+            args = {
+                "classId": class_id,
+                "includeDerived": include_derived,
+                "recurse": True,
+            }
+            found = root.find_members_by_class_id(args)
+            assert found == scan_class_id(root, class_id, include_derived)
+            trie = time_per_call(partial(root.find_members_by_class_id, args), 5)
+            scan = time_per_call(
+                partial(scan_class_id, root, class_id, include_derived), 5
+            )
+            print(
+                f"{size:>8} {label:>20} {len(found):>7} "
+                f"{trie * 1e6:>10.1f} {scan * 1e6:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
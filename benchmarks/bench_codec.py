@@ -0,0 +1,71 @@
+# Encode/decode throughput of the available JSON codecs on typical IS-12 frames.
+# Run from the repository root: python -m benchmarks.bench_codec
+from benchmarks.common import time_per_call
+from codec import CODECS
+from data_types import (
+    MESSAGE_TYPE_COMMAND,
+    MESSAGE_TYPE_COMMAND_RESPONSE,
+    MESSAGE_TYPE_NOTIFICATION,
+    ElementId,
+    NcMethodStatus,
+    NcPropertyChangeType,
+    make_event,
+)
+from nc_block import NcBlock
+
+REPEAT = 20_000
+
+COMMAND = {
+    "messageType": MESSAGE_TYPE_COMMAND,
+    "commands": [
+        {
+            "handle": 1,
+            "oid": 5,
+            "methodId": {"level": 1, "index": 1},
+            "arguments": {"id": {"level": 1, "index": 6}},
+        }
+    ],
+}
+
+RESPONSE = {
+    "messageType": MESSAGE_TYPE_COMMAND_RESPONSE,
+    "responses": [
+        {
+            "handle": 1,
+            "result": {
+                "status": NcMethodStatus.Ok,
+                "value": NcBlock.get_class_descriptor(True).to_dict(),
+            },
+        }
+    ],
+}
+
+NOTIFICATION = {
+    "messageType": MESSAGE_TYPE_NOTIFICATION,
+    "notifications": [
+        make_event(5, ElementId(1, 6), NcPropertyChangeType.ValueChanged, "Label"),
+        make_event(5, ElementId(2, 1), NcPropertyChangeType.ValueChanged, False),
+    ],
+}
+
+
+def main():
+    print(f"{'codec':>8} {'frame':>14} {'encode/s':>12} {'decode/s':>12}")
+    for name, codec in CODECS.items():
+        for label, frame in (
+            ("command", COMMAND),
+            ("response", RESPONSE),
+            ("notification", NOTIFICATION),
+        ):
+            text = codec.dumps(frame)
+            encode = time_per_call(
+                lambda codec=codec, frame=frame: codec.dumps(frame), REPEAT
+            )
+            decode = time_per_call(
+                lambda codec=codec, text=text: codec.loads(text), REPEAT
+            )
+            print(f"{name:>8} {label:>14} {1 / encode:>12,.0f} {1 / decode:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
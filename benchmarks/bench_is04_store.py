@@ -0,0 +1,83 @@
+# IS-04 sender store lookups at 1k and 10k resources: by id, the sorted list
+# view, basic queries through the indexes versus a linear scan, and pages of
+# the version-ordered index.
+# Run from the repository root: python -m benchmarks.bench_is04_store
+from benchmarks.common import time_per_call
+from data_types import NmosSender, tai_timestamp
+from is04_store import SENDER_INDEXES, ResourceStore, matches
+
+SIZES = (1_000, 10_000)
+DEVICES = 50
+TRANSPORTS = (
+    "urn:x-nmos:transport:rtp",
+    "urn:x-nmos:transport:rtp.mcast",
+    "urn:x-nmos:transport:websocket",
+)
+
+
+def build_store(size):
+    store = ResourceStore(SENDER_INDEXES)
+    for n in range(size):
+        store.put(
+            NmosSender(
+                id=f"{n * 7919 % size:08d}-sender",
+                label=f"Sender {n}",
+                description="",
+                version=tai_timestamp(),
+                flow_id=f"{n:08d}-flow",
+                transport=TRANSPORTS[n % len(TRANSPORTS)],
+                device_id=f"device-{n % DEVICES:03d}",
+            )
+        )
+    return store
+
+
+def linear_query(store, params):
+    return [
+        r
+        for r in store.list()
+        if all(matches(r.to_dict(), k, v) for k, v in params.items())
+    ]
+
+
+def bench(size):
+    store = build_store(size)
+    some_id = store.sorted_ids[size // 2]
+    middle = store.get(some_id).version
+    cases = (
+        ("get by id", lambda: store.get(some_id), None),
+        ("sorted list", store.list, None),
+        ("newest page", lambda: store.page({}, limit=100), None),
+        ("page since middle", lambda: store.page({}, since=middle), None),
+        (
+            "filtered page",
+            lambda: store.page({"transport": TRANSPORTS[1]}, limit=100),
+            None,
+        ),
+        ("query device_id", {"device_id": "device-007"}, True),
+        ("query transport", {"transport": TRANSPORTS[1]}, True),
+        (
+            "query both",
+            {"device_id": "device-007", "transport": TRANSPORTS[1]},
+            True,
+        ),
+    )
+    for label, case, is_query in cases:
+        if is_query:
+            assert store.query(case) == linear_query(store, case)
+            indexed = time_per_call(lambda case=case: store.query(case), 200)
+            scan = time_per_call(lambda case=case: linear_query(store, case), 5)
+            print(f"{size:>8} {label:>22} {indexed * 1e6:>11.1f} {scan * 1e6:>11.1f}")
+        else:
+            indexed = time_per_call(case, 200)
+            print(f"{size:>8} {label:>22} {indexed * 1e6:>11.1f} {'':>11}")
+
+
+def main():
+    print(f"{'senders':>8} {'operation':>22} {'indexed us':>11} {'scan us':>11}")
+    for size in SIZES:
+        bench(size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Memory per control object at 100k objects, measured with tracemalloc:
+# bare NcObjects, NcWorkers (wrapper plus base), and NcWorkers added to a
+# block tree with the registry, indexes and cached member descriptors that
+# come with membership.
+# Run from the repository root: python -m benchmarks.bench_object_memory
+import asyncio
+import gc
+import tracemalloc
+
+from benchmarks.common import build_block_tree
+from nc_object import NcObject
+from nc_worker import NcWorker
+
+SIZE = 100_000
+
+
+def make_objects(notifier):
+    return [
+        NcObject(notifier, [1], n, True, 1, f"obj-{n:06d}", None, None, None)
+        for n in range(SIZE)
+    ]
+
+
+def make_workers(notifier):
+    return [
+        NcWorker(
+            class_id=[1, 2],
+            oid=n,
+            constant_oid=True,
+            owner=1,
+            role=f"worker-{n:06d}",
+            user_label=f"Worker {n}",
+            notifier=notifier,
+        )
+        for n in range(SIZE)
+    ]
+
+
+def make_tree(notifier):
+    return build_block_tree(notifier, SIZE, fanout=4, depth=3)
+
+
+async def measure(build):
+    notifier = asyncio.Queue()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build(notifier)
+    # The members notifications queued while building are not per object
+    await asyncio.sleep(0)
+    while not notifier.empty():
+        notifier.get_nowait()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / SIZE
+
+
+async def main():
+    print(f"{'objects':>8} {'kind':>18} {'bytes per object':>17}")
+    for label, build in (
+        ("NcObject", make_objects),
+        ("NcWorker", make_workers),
+        ("NcWorker in tree", make_tree),
+    ):
+        print(f"{SIZE:>8} {label:>18} {await measure(build):>17.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+# Event loop lag while large FindMembersByRole responses are encoded next to a
+# stream of small Gets, with encoding inline versus in the offload pool.
+# Run from the repository root: python -m benchmarks.bench_offload
+import asyncio
+import gc
+import time
+
+import codec
+from benchmarks.common import build_block_tree
+from data_types import MESSAGE_TYPE_COMMAND_RESPONSE
+from offload import EncodeOffload, LoopLagMonitor
+from websocket import execute_command, stream_command_response
+
+MEMBERS = 20_000
+DURATION = 3.0
+THRESHOLD = 1_000
+
+HEAVY = {
+    "handle": 1,
+    "oid": 1,
+    "methodId": {"level": 2, "index": 3},
+    "arguments": {"role": "worker", "recurse": True},
+}
+
+
+def light_command(oid):
+    return {
+        "handle": 2,
+        "oid": oid,
+        "methodId": {"level": 1, "index": 1},
+        "arguments": {"id": {"level": 1, "index": 6}},
+    }
+
+
+async def respond(cmd, root, offload):
+    response = await execute_command(cmd, root)
+    return await stream_command_response(
+        {"messageType": MESSAGE_TYPE_COMMAND_RESPONSE, "responses": [response]},
+        offload=offload,
+    )
+
+
+async def mixed_load(root, worker_oids, offload):
+    monitor = LoopLagMonitor(interval=0.005, max_samples=100_000)
+    monitor.start()
+    deadline = time.perf_counter() + DURATION
+    latencies = []
+
+    async def heavy():
+        while time.perf_counter() < deadline:
+            await respond(HEAVY, root, offload)
+            # Stands in for the socket write between two responses
+            await asyncio.sleep(0)
+
+    async def light():
+        # One small Get every millisecond, latency counted from its due time
+        n = 0
+        due = time.perf_counter()
+        while time.perf_counter() < deadline:
+            await respond(
+                light_command(worker_oids[n % len(worker_oids)]), root, offload
+            )
+            latencies.append(time.perf_counter() - due)
+            n += 1
+            due += 0.001
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+
+    await asyncio.gather(heavy(), light())
+    await monitor.stop()
+    offload.shutdown()
+    latencies.sort()
+    return monitor.stats(), latencies[int(len(latencies) * 0.99)], len(latencies)
+
+
+async def run():
+    notifier = asyncio.Queue()
+    root, worker_oids = build_block_tree(notifier, MEMBERS, fanout=4, depth=3)
+    # Let the member change events land, then drop them so they do not
+    # inflate garbage collection pauses during the measurement
+    await asyncio.sleep(0)
+    while not notifier.empty():
+        notifier.get_nowait()
+    gc.collect()
+    print(
+        f"{'codec':>8} {'encoding':>9} {'mean lag ms':>12} {'p99 lag ms':>11} "
+        f"{'max lag ms':>11} {'light gets':>11} {'p99 get ms':>11}"
+    )
+    for name in codec.CODECS:
+        codec.set_codec(name)
+        for label, threshold in (("inline", None), ("offload", THRESHOLD)):
+            lag, p99_get, gets = await mixed_load(
+                root, worker_oids, EncodeOffload(threshold)
+            )
+            print(
+                f"{name:>8} {label:>9} {lag['meanLagMs']:>12.2f} "
+                f"{lag['p99LagMs']:>11.2f} {lag['maxLagMs']:>11.2f} "
+                f"{gets:>11,} {p99_get * 1000:>11.2f}"
+            )
+    codec.set_codec(None)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
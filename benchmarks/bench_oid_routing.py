@@ -0,0 +1,50 @@
+# Per-command routing latency as the tree grows.
+# Run from the repository root: python -m benchmarks.bench_oid_routing
+import asyncio
+import random
+
+from benchmarks.common import build_block_tree, time_per_call
+from data_types import ElementId, IdArgs
+from nc_block import NcBlock
+
+SIZES = [100, 1_000, 5_000, 20_000]
+LOOKUPS = 20_000
+
+
+def tree_walk(block, oid):
+    # The previous NcBlock.find_member, kept here for comparison
+    for m in block.members:
+        if m.get_oid() == oid:
+            return m
+        if isinstance(m, NcBlock):
+            found = tree_walk(m, oid)
+            if found:
+                return found
+    return None
+
+
+async def main():
+    print(f"{'members':>8} {'get via index (us)':>20} {'tree walk (us)':>16}")
+    for size in SIZES:
+        root, oids = build_block_tree(asyncio.Queue(), size, fanout=4, depth=3)
+        # Let the member-changed notifications scheduled while building run
+        await asyncio.sleep(0)
+        targets = [random.choice(oids) for _ in range(LOOKUPS)]
+        id_args = IdArgs(ElementId(1, 6))
+        it = iter(targets)
+        indexed = time_per_call(
+            lambda root=root, it=it, id_args=id_args: root.get_property(
+                next(it), id_args
+            ),
+            LOOKUPS,
+        )
+        it = iter(targets)
+        walk_count = 200
+        walked = time_per_call(
+            lambda root=root, it=it: tree_walk(root, next(it)), walk_count
+        )
+        print(f"{size:>8} {indexed * 1e6:>20.2f} {walked * 1e6:>16.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+# Registration throughput against a stand-in registry, the registry requests
+# needed to sync a handful of changed resources, and the time to get every
+# resource into a second registry after the first one fails.
+# Run from the repository root: python -m benchmarks.bench_registration
+import asyncio
+import time
+
+from aiohttp import web
+
+from data_types import NmosReceiver, NmosSender, tai_timestamp
+from main import AppState
+from registration import RegistrationClient
+from stand_in_registry import StandInRegistry
+
+SIZES = (100, 1_000)
+CHANGES = 10
+
+
+async def serve(registry):
+    runner = web.AppRunner(registry.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def wait_for(condition, timeout=60.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("condition not reached")
+        await asyncio.sleep(0.005)
+
+
+def build_state(size):
+    state = AppState()
+    for n in range(size):
+        state.put_resource(
+            NmosSender(
+                id=f"sender-{n:06d}",
+                label=f"Sender {n}",
+                description="",
+                version=tai_timestamp(),
+                flow_id=None,
+                transport="urn:x-nmos:transport:rtp.mcast",
+                device_id=state.device.id,
+            )
+        )
+        state.put_resource(
+            NmosReceiver(
+                id=f"receiver-{n:06d}",
+                label=f"Receiver {n}",
+                description="",
+                version=tai_timestamp(),
+                device_id=state.device.id,
+                transport="urn:x-nmos:transport:rtp.mcast",
+                format="urn:x-nmos:format:video",
+            )
+        )
+    return state
+
+
+async def bench(size):
+    state = build_state(size)
+    total = 2 * size + 2
+    primary, secondary = StandInRegistry(), StandInRegistry()
+    runners = []
+    urls = []
+    for registry in (primary, secondary):
+        runner, url = await serve(registry)
+        runners.append(runner)
+        urls.append(url)
+
+    client = RegistrationClient(state, urls, heartbeat_interval=0.05)
+    state.registration = client
+    start = time.perf_counter()
+    client.start()
+    await wait_for(lambda: len(primary) == total)
+    register = time.perf_counter() - start
+    await wait_for(lambda: client.heartbeats >= 3)
+
+    # Relabel a few senders: only those are posted again
+    requests, heartbeats = primary.requests, client.heartbeats
+    for sender in state.senders.list()[:CHANGES]:
+        sender.label += " (renamed)"
+        state.put_resource(sender)
+    await wait_for(
+        lambda: all(
+            primary.resources["sender"][s.id]["label"].endswith("(renamed)")
+            for s in state.senders.list()[:CHANGES]
+        )
+    )
+    delta = primary.requests - requests - (client.heartbeats - heartbeats)
+
+    primary.available = False
+    start = time.perf_counter()
+    await wait_for(lambda: len(secondary) == total)
+    failover = time.perf_counter() - start
+
+    print(
+        f"{total:>10} {register:>11.3f} {total / register:>9,.0f} "
+        f"{delta:>11} {failover:>11.3f} {client.heartbeats:>11}"
+    )
+    await client.stop()
+    for runner in runners:
+        await runner.cleanup()
+
+
+async def run():
+    print(
+        f"{'resources':>10} {'register s':>11} {'per s':>9} "
+        f"{'delta reqs':>11} {'failover s':>11} {'heartbeats':>11}"
+    )
+    for size in SIZES:
+        await bench(size)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
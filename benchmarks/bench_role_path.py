@@ -0,0 +1,57 @@
+# FindMembersByPath (2m2) through the per-block role dicts versus the
+# previous scan of every member on the path, for the role path of a random
+# worker as the tree grows.
+# Run from the repository root: python -m benchmarks.bench_role_path
+import asyncio
+import random
+
+from benchmarks.common import build_block_tree, time_per_call
+from nc_block import NcBlock
+
+SIZES = [1_000, 10_000, 50_000]
+LOOKUPS = 2_000
+
+
+def scan_path(block, segments):
+    # The previous NcBlock._find_members_by_path_recursive, kept here for
+    # comparison
+    first, rest = segments[0], segments[1:]
+    results = []
+    for m in block.members:
+        if m.get_role() == first:
+            if not rest:
+                results.append(block.make_member_descriptor(m, block.get_oid()))
+            elif isinstance(m, NcBlock):
+                results.extend(scan_path(m, rest))
+    return results
+
+
+def role_path(root, oid):
+    path = []
+    while oid != root.get_oid():
+        path.append(root.registry.find(oid).get_role())
+        oid = root.registry.owner_of(oid).get_oid()
+    return path[::-1]
+
+
+async def main():
+    print(f"{'members':>8} {'depth':>6} {'indexed us':>11} {'scan us':>9}")
+    for size in SIZES:
+        root, oids = build_block_tree(asyncio.Queue(), size, fanout=4, depth=3)
+        await asyncio.sleep(0)
+        paths = [role_path(root, random.choice(oids)) for _ in range(LOOKUPS)]
+        for path in paths[:50]:
+            assert root.find_members_by_path({"path": path}) == scan_path(root, path)
+        it = iter(paths)
+        indexed = time_per_call(
+            lambda root=root, it=it: root.find_members_by_path({"path": next(it)}),
+            LOOKUPS,
+        )
+        it = iter(paths)
+        scan = time_per_call(lambda root=root, it=it: scan_path(root, next(it)), 200)
+        depth = sum(map(len, paths)) / len(paths)
+        print(f"{size:>8} {depth:>6.1f} {indexed * 1e6:>11.2f} {scan * 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
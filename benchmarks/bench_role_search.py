@@ -0,0 +1,49 @@
+# FindMembersByRole (2m3) from the device-wide role index versus scanning
+# the blocks, at 100k members, for each search mode.
+# Run from the repository root: python -m benchmarks.bench_role_search
+import asyncio
+import time
+
+from benchmarks.common import build_block_tree, time_per_call
+
+SIZE = 100_000
+SEARCHES = (
+    ("whole, case-insensitive", "WORKER-012345", False, True),
+    ("whole, case-sensitive", "worker-012345", True, True),
+    ("substring", "er-0123", False, False),
+    ("substring, case-sensitive", "er-0123", True, False),
+    ("short substring", "k-", False, False),
+)
+
+
+async def main():
+    indexed_root, _ = build_block_tree(asyncio.Queue(), SIZE, fanout=4, depth=3)
+    scan_root, _ = build_block_tree(asyncio.Queue(), SIZE, fanout=4, depth=3)
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    index = indexed_root.registry.enable_role_index()
+    built = time.perf_counter() - start
+    print(
+        f"{len(index)} roles indexed in {built:.2f} s, "
+        f"{len(index.trigrams)} distinct trigrams"
+    )
+
+    print(f"{'search':>26} {'found':>6} {'indexed us':>11} {'scan us':>10}")
+    for label, role, case_sensitive, match_whole in SEARCHES:
+        args = {
+            "role": role,
+            "caseSensitive": case_sensitive,
+            "matchWholeString": match_whole,
+            "recurse": True,
+        }
+        found = indexed_root.find_members_by_role(args)
+        assert found == scan_root.find_members_by_role(args)
+        indexed = time_per_call(
+            lambda args=args: indexed_root.find_members_by_role(args), 50
+        )
+        scan = time_per_call(lambda args=args: scan_root.find_members_by_role(args), 5)
+        print(f"{label:>26} {len(found):>6} {indexed * 1e6:>11.1f} {scan * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
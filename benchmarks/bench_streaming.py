@@ -0,0 +1,83 @@
+# Longest event loop stall and peak memory of a recursive GetMemberDescriptors
+# response, encoded in one go versus streamed in chunks. Both include the
+# tree walk.
+# Run from the repository root: python -m benchmarks.bench_streaming
+import asyncio
+import time
+import tracemalloc
+
+import codec
+from benchmarks.common import build_block_tree
+from data_types import MESSAGE_TYPE_COMMAND_RESPONSE, ElementId, JsonStream
+from websocket import stream_command_response
+
+SIZES = (10_000, 50_000)
+
+
+def response_for(root, materialise=False):
+    status, _, value = root.invoke_method(1, ElementId(2, 1), {"recurse": True})
+    # Snapshotted up front like execute_command does. Materialised, it is
+    # what the device did before streaming: one list, one json string
+    items = list(value.items)
+    value = items if materialise else JsonStream(items)
+    return {
+        "messageType": MESSAGE_TYPE_COMMAND_RESPONSE,
+        "responses": [{"handle": 1, "result": {"status": int(status), "value": value}}],
+    }
+
+
+async def measure(encode):
+    # A ticker task records the longest gap between two of its wake-ups.
+    # Memory is traced in a second run, tracemalloc slows every allocation
+    # and would inflate the timings
+    longest = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal longest
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            longest = max(longest, now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    text = await encode()
+    total = time.perf_counter() - start
+    running = False
+    await task
+    del text
+    tracemalloc.start()
+    text = await encode()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(text), total, longest, peak
+
+
+async def run():
+    print(
+        f"{'members':>8} {'mode':>8} {'bytes':>12} {'total ms':>10} "
+        f"{'stall ms':>10} {'peak MiB':>10}"
+    )
+    for size in SIZES:
+        root, _ = build_block_tree(asyncio.Queue(), size, fanout=4, depth=4)
+
+        async def one_shot(root=root):
+            return codec.dumps(response_for(root, materialise=True))
+
+        async def streamed(root=root):
+            return await stream_command_response(response_for(root))
+
+        for mode, encode in (("one-shot", one_shot), ("streamed", streamed)):
+            length, total, stall, peak = await measure(encode)
+            print(
+                f"{size:>8} {mode:>8} {length:>12,} {total * 1000:>10.1f} "
+                f"{stall * 1000:>10.1f} {peak / 2**20:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
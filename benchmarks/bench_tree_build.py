@@ -0,0 +1,60 @@
+# Time to build a flat block of N workers one add_member call at a time
+# versus a single add_members call, and the notifications each queues.
+# Run from the repository root: python -m benchmarks.bench_tree_build
+import asyncio
+import time
+
+from nc_block import NcBlock
+from nc_worker import NcWorker
+
+SIZES = (1_000, 2_000, 10_000, 50_000)
+# Adding one at a time is quadratic in time and in the memory held by the
+# queued notifications, so it stops here
+PER_ADD_MAX = 2_000
+
+
+def make_workers(notifier, size):
+    return [
+        NcWorker(
+            class_id=[1, 2],
+            oid=n + 2,
+            constant_oid=True,
+            owner=1,
+            role=f"worker-{n:06d}",
+            user_label=f"Worker {n}",
+            notifier=notifier,
+        )
+        for n in range(size)
+    ]
+
+
+async def build(size, bulk):
+    notifier = asyncio.Queue()
+    root = NcBlock(notifier, True, 1, True, None, "root", None, True)
+    workers = make_workers(notifier, size)
+    start = time.perf_counter()
+    if bulk:
+        root.add_members(workers)
+    else:
+        for worker in workers:
+            root.add_member(worker)
+    # Let the scheduled notification puts run
+    await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    return elapsed, notifier.qsize()
+
+
+async def main():
+    print(f"{'members':>8} {'per add s':>10} {'events':>7} {'bulk s':>8} {'events':>7}")
+    for size in SIZES:
+        if size <= PER_ADD_MAX:
+            per_add, per_add_events = await build(size, bulk=False)
+            per_add_cols = f"{per_add:>10.3f} {per_add_events:>7}"
+        else:
+            per_add_cols = f"{'-':>10} {'-':>7}"
+        bulk, bulk_events = await build(size, bulk=True)
+        print(f"{size:>8} {per_add_cols} {bulk:>8.3f} {bulk_events:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+# Plain traversal, recursive GetMemberDescriptors (2m1) and a scanning
+# FindMembersByRole (2m3) through the iterative walker versus the previous
+# recursive versions, on deep and wide trees of 100k workers.
+# Run from the repository root: python -m benchmarks.bench_tree_walk
+import asyncio
+from functools import partial
+
+from benchmarks.common import build_block_tree, time_per_call
+from nc_block import NcBlock
+from role_index import role_matches
+
+WORKERS = 100_000
+# (label, fanout, depth)
+SHAPES = (
+    ("deep", 1, 20),
+    ("wide", 32, 2),
+    ("deep and wide", 2, 12),
+)
+
+
+def recursive_walk(block):
+    # Plain recursive traversal in the same order, without descriptors
+    owner = block.get_oid()
+    for m in block.members:
+        yield owner, m
+    for m in block.members:
+        if isinstance(m, NcBlock):
+            yield from recursive_walk(m)
+
+
+def recursive_descriptors(block):
+    # The previous NcBlock.iter_member_descriptors, kept here for comparison
+    owner = block.get_oid()
+    for m in block.members:
+        yield block.make_member_descriptor(m, owner)
+    for m in block.members:
+        if isinstance(m, NcBlock):
+            yield from recursive_descriptors(m)
+
+
+def recursive_role_scan(block, role):
+    # The previous NcBlock.find_members_by_role without an index
+    results = [
+        block.make_member_descriptor(m, block.get_oid())
+        for m in block.members
+        if role_matches(m.get_role(), role.lower(), False, False)
+    ]
+    for m in block.members:
+        if isinstance(m, NcBlock):
+            results.extend(recursive_role_scan(m, role))
+    return results
+
+
+async def main():
+    print(
+        f"{'shape':>14} {'blocks':>7} {'walk ms':>8} {'rec ms':>7} "
+        f"{'2m1 walk ms':>12} {'2m1 rec ms':>11} "
+        f"{'2m3 walk ms':>12} {'2m3 rec ms':>11}"
+    )
+    for label, fanout, depth in SHAPES:
+        root, _ = build_block_tree(asyncio.Queue(), WORKERS, fanout, depth)
+        await asyncio.sleep(0)
+        blocks = sum(isinstance(m, NcBlock) for m in root.registry.members.values())
+        role = "worker-0123"
+        args = {"role": role, "recurse": True}
+        assert root.get_member_descriptors({"recurse": True}) == list(
+            recursive_descriptors(root)
+        )
+        assert root.find_members_by_role(args) == recursive_role_scan(root, role)
+        assert list(root.walk_members()) == list(recursive_walk(root))
+        plain = time_per_call(lambda root=root: sum(1 for _ in root.walk_members()), 5)
+        plain_rec = time_per_call(
+            lambda root=root: sum(1 for _ in recursive_walk(root)), 5
+        )
+        walk = time_per_call(partial(root.get_member_descriptors, {"recurse": True}), 5)
+        rec = time_per_call(lambda root=root: list(recursive_descriptors(root)), 5)
+        role_walk = time_per_call(partial(root.find_members_by_role, args), 5)
+        role_rec = time_per_call(partial(recursive_role_scan, root, role), 5)
+        print(
+            f"{label:>14} {blocks:>7} {plain * 1e3:>8.1f} {plain_rec * 1e3:>7.1f} "
+            f"{walk * 1e3:>12.1f} {rec * 1e3:>11.1f} "
+            f"{role_walk * 1e3:>12.1f} {role_rec * 1e3:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+import asyncio
+import time
+from typing import Callable, List, Tuple
+
+from nc_block import NcBlock
+from nc_worker import NcWorker
+
+
+def time_per_call(fn: Callable[[], object], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def build_block_tree(
+    notifier: asyncio.Queue, n_workers: int, fanout: int, depth: int
+) -> Tuple[NcBlock, List[int]]:
+    # Root block plus `fanout` nested blocks per level, `depth` levels deep,
+    # with the workers spread evenly over every block of the tree. Each
+    # block gets its members in one add_members call
+    next_oid = 1
+    root = NcBlock(notifier, True, next_oid, True, None, "root", None, True)
+    blocks = [root]
+    level = [root]
+    for _ in range(depth):
+        children = []
+        for parent in level:
+            nested = []
+            for i in range(fanout):
+                next_oid += 1
+                nested.append(
+                    NcBlock(
+                        notifier,
+                        False,
+                        next_oid,
+                        True,
+                        parent.get_oid(),
+                        f"block-{i:02d}",
+                        None,
+                        True,
+                    )
+                )
+            parent.add_members(nested)
+            children.extend(nested)
+        blocks.extend(children)
+        level = children
+
+    workers: List[List[NcWorker]] = [[] for _ in blocks]
+    worker_oids = []
+    for n in range(n_workers):
+        b = n % len(blocks)
+        next_oid += 1
+        workers[b].append(
+            NcWorker(
+                class_id=[1, 2],
+                oid=next_oid,
+                constant_oid=True,
+                owner=blocks[b].get_oid(),
+                role=f"worker-{n:06d}",
+                user_label=f"Worker {n}",
+                notifier=notifier,
+            )
+        )
+        worker_oids.append(next_oid)
+    for block, members in zip(blocks, workers):
+        block.add_members(members)
+    return root, worker_oids
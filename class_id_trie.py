@@ -0,0 +1,64 @@
+from typing import Dict, List, Sequence, Set
+
+
+class _Node:
+    __slots__ = ("children", "oids")
+
+    def __init__(self):
+        self.children: Dict[int, _Node] = {}
+        self.oids: Set[int] = set()
+
+
+# Oids by class id, one level per class id component, so a class and every
+# class derived from it share a subtree. Lookups cost the class id's depth
+# plus the oids found
+class ClassIdTrie:
+    def __init__(self):
+        self.root = _Node()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, class_id: Sequence[int], oid: int) -> None:
+        node = self.root
+        for part in class_id:
+            node = node.children.setdefault(part, _Node())
+        if oid not in node.oids:
+            node.oids.add(oid)
+            self.size += 1
+
+    def remove(self, class_id: Sequence[int], oid: int) -> None:
+        path = [self.root]
+        for part in class_id:
+            node = path[-1].children.get(part)
+            if node is None:
+                return
+            path.append(node)
+        if oid not in path[-1].oids:
+            return
+        path[-1].oids.discard(oid)
+        self.size -= 1
+        # Prune the branch back up to the first node still in use
+        for depth in range(len(path) - 1, 0, -1):
+            if path[depth].oids or path[depth].children:
+                break
+            del path[depth - 1].children[class_id[depth - 1]]
+
+    def find(self, class_id: Sequence[int], include_derived: bool = False) -> List[int]:
+        # Oids of the class, and of every class derived from it when asked,
+        # in no particular order
+        node = self.root
+        for part in class_id:
+            node = node.children.get(part)
+            if node is None:
+                return []
+        if not include_derived:
+            return list(node.oids)
+        found: List[int] = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            found.extend(node.oids)
+            stack.extend(node.children.values())
+        return found
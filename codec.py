@@ -0,0 +1,97 @@
+import json
+from dataclasses import asdict
+from enum import IntEnum
+from typing import Any, Dict, Optional
+
+from data_types import ElementId, JsonFragment, JsonStream
+
+try:
+    import orjson
+except ImportError:  # optional dependency, stdlib json is used instead
+    orjson = None
+
+
+def to_json_compatible(o: Any) -> Any:
+    # IntEnum -> numeric value
+    if isinstance(o, IntEnum):
+        return int(o)
+    # ElementId as dict
+    if isinstance(o, ElementId):
+        return {"level": o.level, "index": o.index}
+    # JsonFragment outside a command response -> decode it back
+    if isinstance(o, JsonFragment):
+        return o.decode()
+    # JsonStream outside the streaming path -> materialise it
+    if isinstance(o, JsonStream):
+        return list(o.items)
+    # data_types dataclasses know their own wire format
+    if hasattr(o, "to_dict"):
+        return o.to_dict()
+    # Generic fallback for other dataclasses
+    if hasattr(o, "__dataclass_fields__"):
+        return asdict(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class CustomEncoder(json.JSONEncoder):
+    def default(self, o):
+        try:
+            return to_json_compatible(o)
+        except TypeError:
+            return super().default(o)
+
+
+class JsonCodec:
+    name = "json"
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj, cls=CustomEncoder)
+
+    def loads(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> str:
+        return orjson.dumps(
+            obj,
+            default=to_json_compatible,
+            # Route dataclasses through to_dict for their camelCase names
+            option=orjson.OPT_PASSTHROUGH_DATACLASS,
+        ).decode()
+
+    def loads(self, data: str | bytes) -> Any:
+        return orjson.loads(data)
+
+
+CODECS: Dict[str, JsonCodec] = {"json": JsonCodec()}
+if orjson is not None:
+    CODECS["orjson"] = OrjsonCodec()
+
+_codec: JsonCodec = CODECS.get("orjson", CODECS["json"])
+
+
+def get_codec() -> JsonCodec:
+    return _codec
+
+
+def set_codec(name: Optional[str]) -> JsonCodec:
+    # None picks the fastest codec available
+    global _codec
+    if name is None:
+        _codec = CODECS.get("orjson", CODECS["json"])
+    elif name in CODECS:
+        _codec = CODECS[name]
+    else:
+        raise ValueError(f"JSON codec {name} is not available")
+    return _codec
+
+
+def dumps(obj: Any) -> str:
+    return _codec.dumps(obj)
+
+
+def loads(data: str | bytes) -> Any:
+    return _codec.loads(data)
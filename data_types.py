@@ -1,6 +1,7 @@
 from dataclasses import dataclass, field
+import json
 import time
-from typing import Any, List, Optional, Dict
+from typing import Any, Iterable, List, Optional, Dict
 from enum import IntEnum
 
 MESSAGE_TYPE_COMMAND = 0
@@ -10,6 +11,9 @@ MESSAGE_TYPE_SUBSCRIPTION = 3
 MESSAGE_TYPE_SUBSCRIPTION_RESPONSE = 4
 MESSAGE_TYPE_ERROR = 5
 
+# Marks an attribute that has not been set yet
+_UNSET = object()
+
 
 @dataclass
 class NcPropertyConstraintsNumber:
@@ -1241,7 +1245,29 @@ class NmosResource:
     label: str
     description: str
     version: str
-    tags: Dict[str, List[str]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        # Only changes made after construction move the version on
+        object.__setattr__(self, "_tracking", True)
+
+    def __setattr__(self, name: str, value: Any):
+        # Assigning a new value to any attribute marks the resource dirty by
+        # bumping its version. In-place changes to list or dict attributes
+        # are not seen here and need an explicit bump_version()
+        changed = (
+            name != "version"
+            and self.__dict__.get("_tracking", False)
+            and self.__dict__.get(name, _UNSET) != value
+        )
+        object.__setattr__(self, name, value)
+        if changed:
+            self.bump_version()
+
+    def bump_version(self) -> str:
+        # Every change to the resource must move its version on, strictly
+        # forwards even when the clock has not moved since the last one
+        self.version = next_version(self.version, tai_timestamp())
+        return self.version
 
 
 @dataclass
@@ -1259,11 +1285,7 @@ class DeviceControl:
 
 
 @dataclass
-class NmosDevice:
-    id: str
-    label: str
-    description: str
-    version: str
+class NmosDevice(NmosResource):
     senders: List[str]
     receivers: List[str]
     node_id: str
@@ -1286,6 +1308,125 @@ class NmosDevice:
         }
 
 
+@dataclass
+class NmosSource(NmosResource):
+    device_id: str
+    format: str
+    clock_name: Optional[str] = None
+    grain_rate: Optional[Dict[str, int]] = None
+    parents: List[str] = field(default_factory=list)
+    caps: Dict[str, Any] = field(default_factory=dict)
+    tags: Dict[str, List[str]] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        d = {
+            "id": self.id,
+            "label": self.label,
+            "description": self.description,
+            "version": self.version,
+            "tags": self.tags,
+            "caps": self.caps,
+            "device_id": self.device_id,
+            "parents": self.parents,
+            "clock_name": self.clock_name,
+            "format": self.format,
+        }
+        if self.grain_rate is not None:
+            d["grain_rate"] = self.grain_rate
+        return d
+
+
+@dataclass
+class NmosFlow(NmosResource):
+    source_id: str
+    device_id: str
+    format: str
+    media_type: Optional[str] = None
+    grain_rate: Optional[Dict[str, int]] = None
+    parents: List[str] = field(default_factory=list)
+    tags: Dict[str, List[str]] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        d = {
+            "id": self.id,
+            "label": self.label,
+            "description": self.description,
+            "version": self.version,
+            "tags": self.tags,
+            "source_id": self.source_id,
+            "device_id": self.device_id,
+            "parents": self.parents,
+            "format": self.format,
+        }
+        if self.media_type is not None:
+            d["media_type"] = self.media_type
+        if self.grain_rate is not None:
+            d["grain_rate"] = self.grain_rate
+        return d
+
+
+@dataclass
+class NmosSender(NmosResource):
+    flow_id: Optional[str]
+    transport: str
+    device_id: str
+    manifest_href: Optional[str] = None
+    interface_bindings: List[str] = field(default_factory=list)
+    subscription_receiver_id: Optional[str] = None
+    subscription_active: bool = False
+    caps: Dict[str, Any] = field(default_factory=dict)
+    tags: Dict[str, List[str]] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "description": self.description,
+            "version": self.version,
+            "tags": self.tags,
+            "caps": self.caps,
+            "flow_id": self.flow_id,
+            "transport": self.transport,
+            "device_id": self.device_id,
+            "manifest_href": self.manifest_href,
+            "interface_bindings": self.interface_bindings,
+            "subscription": {
+                "receiver_id": self.subscription_receiver_id,
+                "active": self.subscription_active,
+            },
+        }
+
+
+@dataclass
+class NmosReceiver(NmosResource):
+    device_id: str
+    transport: str
+    format: str
+    interface_bindings: List[str] = field(default_factory=list)
+    subscription_sender_id: Optional[str] = None
+    subscription_active: bool = False
+    caps: Dict[str, Any] = field(default_factory=dict)
+    tags: Dict[str, List[str]] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "description": self.description,
+            "version": self.version,
+            "tags": self.tags,
+            "caps": self.caps,
+            "device_id": self.device_id,
+            "transport": self.transport,
+            "format": self.format,
+            "interface_bindings": self.interface_bindings,
+            "subscription": {
+                "sender_id": self.subscription_sender_id,
+                "active": self.subscription_active,
+            },
+        }
+
+
 @dataclass
 class NmosClock:
     name: str
@@ -1339,11 +1480,7 @@ class NmosApi:
 
 
 @dataclass
-class NmosNode:
-    id: str
-    label: str
-    description: str
-    version: str
+class NmosNode(NmosResource):
     href: str
     hostname: str
     clocks: List["NmosClock"]
@@ -1735,6 +1872,21 @@ def tai_timestamp() -> str:
     return f"{secs}:{nsec}"
 
 
+def next_version(previous: str, candidate: str) -> str:
+    # candidate, unless it does not come after previous: then previous + 1ns
+    try:
+        prev_secs, prev_nsec = (int(x) for x in previous.split(":"))
+    except ValueError:
+        return candidate
+    secs, nsec = (int(x) for x in candidate.split(":"))
+    if (secs, nsec) > (prev_secs, prev_nsec):
+        return candidate
+    prev_nsec += 1
+    if prev_nsec == 1_000_000_000:
+        prev_secs, prev_nsec = prev_secs + 1, 0
+    return f"{prev_secs}:{prev_nsec}"
+
+
 def make_event(
     oid: int,
     prop_id: ElementId,
@@ -1747,3 +1899,26 @@ def make_event(
         event_id=ElementId(1, 1),
         event_data=NcPropertyChangedEventData(prop_id, change_type, value, seq_idx),
     )
+
+
+@dataclass(frozen=True)
+class JsonFragment:
+    # Already encoded JSON, spliced verbatim into outgoing messages
+    text: str
+
+    @staticmethod
+    def encode(value: Any) -> "JsonFragment":
+        return JsonFragment(json.dumps(value, separators=(",", ":")))
+
+    @staticmethod
+    def join(items: Iterable["JsonFragment"]) -> "JsonFragment":
+        return JsonFragment("[" + ",".join(item.text for item in items) + "]")
+
+    def decode(self) -> Any:
+        return json.loads(self.text)
+
+
+@dataclass(frozen=True)
+class JsonStream:
+    # Sequence value produced lazily, encoded in chunks by the websocket layer
+    items: Iterable[Any]
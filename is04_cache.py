@@ -0,0 +1,63 @@
+import hashlib
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from aiohttp import web
+
+import codec
+
+
+# Encoded IS-04 response bodies, re-encoded only when the version of the
+# resources behind them changes
+class ResourceBodyCache:
+    def __init__(self):
+        # key -> (version, encoded body, etag)
+        self._entries: Dict[Hashable, Tuple[str, bytes, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, key: Hashable, version: str, build: Callable[[], Any]
+    ) -> Tuple[bytes, str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            body = codec.dumps(build()).encode()
+            # From the body rather than the version: list versions are store
+            # revisions, which start again from 0 in every process
+            etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+            entry = (version, body, etag)
+            self._entries[key] = entry
+        return entry[1], entry[2]
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        # Weak comparison, as If-None-Match requires
+        if tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cached_json_response(
+    request: web.Request,
+    cache: ResourceBodyCache,
+    key: Hashable,
+    version: str,
+    build: Callable[[], Any],
+) -> web.Response:
+    body, etag = cache.get(key, version, build)
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return web.Response(status=304, headers={"ETag": etag})
+    return web.Response(
+        body=body, content_type="application/json", headers={"ETag": etag}
+    )
@@ -0,0 +1,274 @@
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from data_types import NmosResource, tai_timestamp
+
+# Attributes each resource type keeps a secondary index on, in query syntax
+SOURCE_INDEXES = ("label", "device_id", "format")
+FLOW_INDEXES = ("label", "device_id", "source_id", "format")
+SENDER_INDEXES = ("label", "device_id", "flow_id", "transport")
+RECEIVER_INDEXES = ("label", "device_id", "transport", "format")
+
+# Query parameters in these namespaces are not attribute filters
+RESERVED_QUERY_PREFIXES = ("paging.", "query.")
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+# (seconds, nanoseconds) of a TAI version string, ordered like the versions
+VersionKey = Tuple[int, int]
+
+
+def query_value(value: Any) -> str:
+    # How an attribute value compares to a query string parameter
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    return str(value)
+
+
+def lookup(d: Mapping[str, Any], path: str) -> Any:
+    # Nested attributes are addressed with dots, e.g. subscription.active
+    value: Any = d
+    for key in path.split("."):
+        if not isinstance(value, Mapping) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def parse_version(version: str) -> VersionKey:
+    try:
+        secs, nanos = version.split(":")
+        key = (int(secs), int(nanos))
+    except ValueError:
+        key = (-1, -1)
+    if key[0] < 0 or not 0 <= key[1] < 1_000_000_000:
+        raise ValueError(f"Invalid version {version}")
+    return key
+
+
+def format_version(key: VersionKey) -> str:
+    return f"{key[0]}:{key[1]}"
+
+
+def matches(d: Mapping[str, Any], path: str, expected: str) -> bool:
+    value = lookup(d, path)
+    if isinstance(value, list):
+        return any(query_value(v) == expected for v in value)
+    return query_value(value) == expected
+
+
+@dataclass
+class Page:
+    # Resources updated in (since, until], most recently updated first
+    resources: List[NmosResource]
+    since: str
+    until: str
+    limit: int
+
+
+# In-memory IS-04 resources of one type: id -> resource, ids kept sorted for
+# the list views, plus attribute -> value -> ids indexes for basic queries
+class ResourceStore:
+    def __init__(self, indexed: Iterable[str] = ()):
+        self.resources: Dict[str, NmosResource] = {}
+        self.sorted_ids: List[str] = []
+        self.indexes: Dict[str, Dict[str, Set[str]]] = {a: {} for a in indexed}
+        # id -> the (attribute, value) entries it was indexed under, as
+        # resources are mutated in place before being put again
+        self._indexed_as: Dict[str, List[Tuple[str, str]]] = {}
+        # Moves on with every change, usable as a cache version for the list
+        self.revision = 0
+        # Version-ordered index for paging: two lists kept in step, sorted
+        # by version
+        self._version_keys: List[VersionKey] = []
+        self._version_ids: List[str] = []
+        self._version_of: Dict[str, VersionKey] = {}
+
+    def __len__(self) -> int:
+        return len(self.resources)
+
+    def __contains__(self, resource_id: str) -> bool:
+        return resource_id in self.resources
+
+    def get(self, resource_id: str) -> Optional[NmosResource]:
+        return self.resources.get(resource_id)
+
+    def put(self, resource: NmosResource) -> None:
+        # Adds a resource, or re-indexes it after it changed
+        if resource.id in self.resources:
+            self._unindex(resource.id)
+            self._unindex_version(resource.id)
+        else:
+            insort(self.sorted_ids, resource.id)
+        self.resources[resource.id] = resource
+        self._index(resource)
+        self._index_version(resource)
+        self.revision += 1
+
+    def remove(self, resource_id: str) -> Optional[NmosResource]:
+        resource = self.resources.pop(resource_id, None)
+        if resource is None:
+            return None
+        self._unindex(resource_id)
+        self._unindex_version(resource_id)
+        del self.sorted_ids[bisect_left(self.sorted_ids, resource_id)]
+        self.revision += 1
+        return resource
+
+    def list(self) -> List[NmosResource]:
+        return [self.resources[i] for i in self.sorted_ids]
+
+    def query(self, params: Mapping[str, str]) -> List[NmosResource]:
+        filters = {
+            k: v for k, v in params.items() if not k.startswith(RESERVED_QUERY_PREFIXES)
+        }
+        if not filters:
+            return self.list()
+        return [self.resources[i] for i in self._filter(filters)]
+
+    def page(
+        self,
+        params: Mapping[str, str],
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_LIMIT,
+    ) -> Page:
+        # Without since, the page holds the newest matches up to until. With
+        # since only, it holds the oldest matches after since. Raises
+        # ValueError on malformed or inverted bounds
+        since_key = parse_version(since) if since is not None else (0, 0)
+        until_key = parse_version(until) if until is not None else None
+        if until_key is not None and until_key < since_key:
+            raise ValueError("paging.since is after paging.until")
+
+        filters = {
+            k: v for k, v in params.items() if not k.startswith(RESERVED_QUERY_PREFIXES)
+        }
+        wanted = set(self._filter(filters, ordered=False)) if filters else None
+        keys, ids = self._version_keys, self._version_ids
+        lo = bisect_right(keys, since_key)
+        hi = len(keys) if until_key is None else bisect_right(keys, until_key)
+
+        picked: List[int] = []
+        if since is not None and until is None:
+            for i in range(lo, hi):
+                if wanted is None or ids[i] in wanted:
+                    picked.append(i)
+                    if len(picked) == limit:
+                        break
+            if len(picked) == limit:
+                stop = min(bisect_right(keys, keys[picked[-1]]), hi)
+                picked = self._whole_versions(picked, stop, wanted)
+                until_key = keys[picked[-1]]
+            picked.reverse()
+        else:
+            for i in range(hi - 1, lo - 1, -1):
+                if wanted is None or ids[i] in wanted:
+                    picked.append(i)
+                    if len(picked) == limit:
+                        break
+            if len(picked) == limit:
+                start = max(bisect_left(keys, keys[picked[-1]]), lo)
+                picked = self._whole_versions(picked, start - 1, wanted)
+                start = max(bisect_left(keys, keys[picked[-1]]), lo)
+                if start > lo:
+                    # Anything at or below the version just before the
+                    # oldest pick belongs to the previous page
+                    since_key = keys[start - 1]
+
+        return Page(
+            resources=[self.resources[ids[i]] for i in picked],
+            since=format_version(since_key),
+            until=tai_timestamp() if until_key is None else format_version(until_key),
+            limit=limit,
+        )
+
+    def _whole_versions(
+        self, picked: List[int], stop: int, wanted: Optional[Set[str]]
+    ) -> List[int]:
+        # A full page must not split resources sharing a version, the next
+        # page's version bounds could not tell them apart. When matches of
+        # the last picked version are left before stop, that version's picks
+        # are dropped, or all its matches are taken when it fills the page
+        keys, ids = self._version_keys, self._version_ids
+        last = picked[-1]
+        step = 1 if stop > last else -1
+        rest = [
+            i
+            for i in range(last + step, stop, step)
+            if wanted is None or ids[i] in wanted
+        ]
+        if not rest:
+            return picked
+        kept = [i for i in picked if keys[i] != keys[last]]
+        return kept or picked + rest
+
+    def _filter(self, filters: Mapping[str, str], ordered: bool = True) -> List[str]:
+        # Ids matching every filter, in id order when ordered. The indexes
+        # narrow the candidates down first, smallest set first
+        indexed = sorted(
+            (
+                self.indexes[k].get(v, set())
+                for k, v in filters.items()
+                if k in self.indexes
+            ),
+            key=len,
+        )
+        if indexed:
+            candidates = set(indexed[0])
+            for ids in indexed[1:]:
+                candidates &= ids
+            ids = sorted(candidates) if ordered else list(candidates)
+        else:
+            ids = self.sorted_ids
+
+        # Attributes without an index are checked on what is left
+        rest = [(k, v) for k, v in filters.items() if k not in self.indexes]
+        if not rest:
+            return list(ids)
+        results = []
+        for i in ids:
+            d = self.resources[i].to_dict()
+            if all(matches(d, k, v) for k, v in rest):
+                results.append(i)
+        return results
+
+    def _index(self, resource: NmosResource) -> None:
+        d = resource.to_dict()
+        entries = []
+        for attribute, values in self.indexes.items():
+            value = lookup(d, attribute)
+            for v in value if isinstance(value, list) else [value]:
+                key = query_value(v)
+                entries.append((attribute, key))
+                values.setdefault(key, set()).add(resource.id)
+        self._indexed_as[resource.id] = entries
+
+    def _unindex(self, resource_id: str) -> None:
+        for attribute, value in self._indexed_as.pop(resource_id, ()):
+            ids = self.indexes[attribute].get(value)
+            if ids is not None:
+                ids.discard(resource_id)
+                if not ids:
+                    del self.indexes[attribute][value]
+
+    def _index_version(self, resource: NmosResource) -> None:
+        key = parse_version(resource.version)
+        i = bisect_right(self._version_keys, key)
+        self._version_keys.insert(i, key)
+        self._version_ids.insert(i, resource.id)
+        self._version_of[resource.id] = key
+
+    def _unindex_version(self, resource_id: str) -> None:
+        key = self._version_of.pop(resource_id, None)
+        if key is None:
+            return
+        i = bisect_left(self._version_keys, key)
+        while self._version_ids[i] != resource_id:
+            i += 1
+        del self._version_keys[i]
+        del self._version_ids[i]
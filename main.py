@@ -1,14 +1,16 @@
+import argparse
 import asyncio
-import json
+import os
+import signal
 import uuid
 import socket
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from aiohttp import web
 
+import codec
 from data_types import (
     DeviceControl,
-    MESSAGE_TYPE_NOTIFICATION,
     NcManufacturer,
     NcProduct,
     NmosNode,
@@ -17,25 +19,112 @@ from data_types import (
     NmosApi,
     NmosEndpoint,
     NmosDevice,
+    NmosFlow,
+    NmosReceiver,
+    NmosResource,
+    NmosSender,
+    NmosSource,
     tai_timestamp,
     NcTouchpointNmos,
     NcTouchpoint,
     NcTouchpointResourceNmos,
 )
 
+from is04_cache import ResourceBodyCache, cached_json_response
+from is04_store import (
+    DEFAULT_PAGE_LIMIT,
+    FLOW_INDEXES,
+    MAX_PAGE_LIMIT,
+    RECEIVER_INDEXES,
+    RESERVED_QUERY_PREFIXES,
+    SENDER_INDEXES,
+    SOURCE_INDEXES,
+    ResourceStore,
+)
 from nc_block import NcBlock
 from nc_device_manager import NcDeviceManager
 from nc_class_manager import NcClassManager
 from nc_object import NcObject
 from nc_worker import NcWorker
-from websocket import CustomEncoder, websocket_handler
+from offload import EncodeOffload, LoopLagMonitor, payload_size
+from registration import RegistrationClient
+from websocket import (
+    SLOW_CONSUMER_COALESCE,
+    SLOW_CONSUMER_DISCONNECT,
+    SLOW_CONSUMER_DROP_OLDEST,
+    SubscriptionIndex,
+    websocket_handler,
+)
 
 
 class AppState:
-    def __init__(self):
+    def __init__(
+        self,
+        notification_window: Optional[float] = None,
+        notification_batch_size: int = 256,
+        max_pending_notifications: int = 1024,
+        slow_consumer_policy: str = SLOW_CONSUMER_DROP_OLDEST,
+        coalesce_notifications: bool = False,
+        concurrent_commands: bool = False,
+        max_inflight_commands: int = 64,
+        encode_offload_threshold: Optional[int] = None,
+        encode_workers: int = 2,
+        loop_lag_interval: Optional[float] = None,
+        registry_urls: Optional[List[str]] = None,
+        role_index: bool = False,
+    ):
         self.connections: Dict[str, any] = {}
         self.event_queue: Optional[asyncio.Queue] = None
         self.root_block: Optional[NcBlock] = None
+        self.subscriptions = SubscriptionIndex()
+        # Encoded IS-04 bodies, keyed by resource and checked against versions
+        self.is04_cache = ResourceBodyCache()
+        # IS-04 resources of the device beyond the node and device itself
+        self.sources = ResourceStore(SOURCE_INDEXES)
+        self.flows = ResourceStore(FLOW_INDEXES)
+        self.senders = ResourceStore(SENDER_INDEXES)
+        self.receivers = ResourceStore(RECEIVER_INDEXES)
+        self.stores: Dict[type, ResourceStore] = {
+            NmosSource: self.sources,
+            NmosFlow: self.flows,
+            NmosSender: self.senders,
+            NmosReceiver: self.receivers,
+        }
+        # Coalescing mode: when a window (in seconds) is set, events arriving
+        # within it are sent as one Notification message per connection
+        self.notification_window = notification_window
+        self.notification_batch_size = notification_batch_size
+        # Per-connection notification queue bound and what happens when a
+        # controller does not keep up with it
+        self.max_pending_notifications = max_pending_notifications
+        self.slow_consumer_policy = slow_consumer_policy
+        # Keep only the latest pending ValueChanged per (oid, property) for
+        # each connection, whatever the update rate
+        self.coalesce_notifications = coalesce_notifications
+        # Run commands concurrently (ordered per oid only) and stream their
+        # responses back one by one instead of one response per message
+        self.concurrent_commands = concurrent_commands
+        # Concurrent commands a connection may have in flight before its
+        # further messages wait to be read
+        self.max_inflight_commands = max_inflight_commands
+        # Responses and notifications whose value holds at least this many
+        # items are encoded in a worker thread, None keeps all on the loop
+        self.encode_offload = EncodeOffload(encode_offload_threshold, encode_workers)
+        # Sample event loop lag every `loop_lag_interval` seconds when set
+        self.loop_lag = (
+            LoopLagMonitor(loop_lag_interval) if loop_lag_interval is not None else None
+        )
+        # Registries to register with, in failover order. None keeps the
+        # node unregistered (peer to peer only)
+        self.registration = (
+            RegistrationClient(self, registry_urls) if registry_urls else None
+        )
+        # Set once worker processes have forked with a copy of the stores,
+        # which they would keep serving whatever changed here afterwards
+        self.resources_frozen = False
+        # Answer FindMembersByRole from a device-wide role search index
+        # rather than by scanning the blocks
+        self.role_index = role_index
 
         # Get hostname
         hostname = socket.gethostname()
@@ -85,28 +174,120 @@ class AppState:
             ],
         )
 
+    def put_resource(self, resource: NmosResource):
+        # Adds a source, flow, sender or receiver, or stores it again after
+        # a change, keeping the device's sender and receiver lists in step
+        self._check_resources_mutable()
+        store = self.stores[type(resource)]
+        added = resource.id not in store
+        store.put(resource)
+        if added and isinstance(resource, NmosSender):
+            self.device.senders.append(resource.id)
+            self.device.bump_version()
+        elif added and isinstance(resource, NmosReceiver):
+            self.device.receivers.append(resource.id)
+            self.device.bump_version()
+        self.resources_changed()
+
+    def remove_resource(self, resource_type: type, resource_id: str):
+        self._check_resources_mutable()
+        resource = self.stores[resource_type].remove(resource_id)
+        if resource is None:
+            return None
+        if resource_type is NmosSender:
+            self.device.senders.remove(resource_id)
+            self.device.bump_version()
+        elif resource_type is NmosReceiver:
+            self.device.receivers.remove(resource_id)
+            self.device.bump_version()
+        self.is04_cache.invalidate((resource_type.__name__, resource_id))
+        self.resources_changed()
+        return resource
+
+    def _check_resources_mutable(self):
+        if self.resources_frozen:
+            raise RuntimeError(
+                "IS-04 resources cannot change in worker mode, the workers "
+                "serve the copy taken when they were forked"
+            )
+
+    def resources_changed(self):
+        # Lets the registration client reconcile now, for changes to the node
+        # or device it would otherwise notice at the next heartbeat
+        if self.registration is not None:
+            self.registration.mark_changed()
+
+    def registration_tiers(self):
+        # Resources by type in the order a registry accepts them
+        return [
+            ("node", [self.node]),
+            ("device", [self.device]),
+            ("source", self.sources.list()),
+            ("flow", self.flows.list()),
+            ("sender", self.senders.list()),
+            ("receiver", self.receivers.list()),
+        ]
+
     async def setup(self):
         self.event_queue = asyncio.Queue()
         asyncio.create_task(self.event_loop())
-
-    async def notify_subscribers(self, ev):
-        text = json.dumps(
-            {
-                "messageType": MESSAGE_TYPE_NOTIFICATION,
-                "notifications": [ev.to_dict()],
-            },
-            cls=CustomEncoder,
-        )
-        for conn in list(self.connections.values()):
-            if ev.oid in conn.subscribed_oids:
-                try:
-                    await conn.send_text(text)
-                except Exception:
-                    pass
+        if self.loop_lag is not None:
+            self.loop_lag.start()
+        if self.registration is not None:
+            self.registration.start()
+
+    async def close(self):
+        if self.registration is not None:
+            await self.registration.stop()
+        if self.loop_lag is not None:
+            await self.loop_lag.stop()
+        self.encode_offload.shutdown()
+
+    async def notify_subscribers(self, events):
+        # Events nobody subscribed to are dropped before any encoding, the
+        # others are encoded once and handed to each subscriber's writer task
+        for ev in events:
+            subscribers = self.subscriptions.subscribers(ev.oid)
+            if not subscribers:
+                continue
+            text = await self.encode_offload.dumps(
+                ev.to_dict(), payload_size(ev.event_data.value)
+            )
+            for conn in subscribers:
+                conn.queue_notification(ev, text)
+
+    def connection_stats(self) -> Dict[str, dict]:
+        return {conn_id: conn.stats() for conn_id, conn in self.connections.items()}
+
+    def loop_stats(self) -> dict:
+        return {
+            "encode": self.encode_offload.stats(),
+            "loopLag": self.loop_lag.stats() if self.loop_lag is not None else None,
+        }
+
+    async def collect_events(self, events):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.notification_window
+        while len(events) < self.notification_batch_size:
+            try:
+                events.append(self.event_queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                events.append(await asyncio.wait_for(self.event_queue.get(), timeout))
+            except asyncio.exceptions.TimeoutError:  # not builtin before 3.11
+                break
 
     async def event_loop(self):
         while True:
-            await self.notify_subscribers(await self.event_queue.get())
+            events = [await self.event_queue.get()]
+            if self.notification_window is not None:
+                await self.collect_events(events)
+            await self.notify_subscribers(events)
 
 
 app_state = AppState()
@@ -123,59 +304,213 @@ async def base_is_04_rest_api_handler(request):
 
 async def node_self_rest_api_handler(request):
     app_state = request.app["app_state"]
-    return web.json_response(app_state.node.to_dict())
+    node = app_state.node
+    return cached_json_response(
+        request, app_state.is04_cache, "self", node.version, node.to_dict
+    )
+
+
+def resource_list_response(request, store, name):
+    # Basic queries go through the store indexes, the unfiltered list is
+    # cached until the store changes
+    if any(k.startswith("paging.") for k in request.query):
+        return resource_page_response(request, store)
+    if any(not k.startswith(RESERVED_QUERY_PREFIXES) for k in request.query):
+        return web.json_response(
+            [r.to_dict() for r in store.query(request.query)], dumps=codec.dumps
+        )
+    return cached_json_response(
+        request,
+        request.app["app_state"].is04_cache,
+        name,
+        str(store.revision),
+        lambda: [r.to_dict() for r in store.list()],
+    )
+
+
+def resource_page_response(request, store):
+    # IS-04 paging, most recently updated first, from the store's
+    # version-ordered index
+    query = request.query
+    if query.get("paging.order", "update") != "update":
+        return web.json_response(
+            {"error": "only paging.order=update is supported"}, status=501
+        )
+    try:
+        limit = int(query.get("paging.limit", DEFAULT_PAGE_LIMIT))
+        if limit <= 0:
+            raise ValueError("paging.limit must be positive")
+        page = store.page(
+            query,
+            since=query.get("paging.since"),
+            until=query.get("paging.until"),
+            limit=min(limit, MAX_PAGE_LIMIT),
+        )
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+
+    def link(**paging):
+        params = {k: v for k, v in query.items() if not k.startswith("paging.")}
+        params.update({f"paging.{k}": v for k, v in paging.items()})
+        params["paging.limit"] = str(page.limit)
+        return str(request.url.with_query(params))
+
+    links = (
+        ("next", link(since=page.until)),
+        ("prev", link(until=page.since)),
+        ("first", link(since="0:0")),
+        ("last", link()),
+    )
+    return web.json_response(
+        [r.to_dict() for r in page.resources],
+        dumps=codec.dumps,
+        headers={
+            "Link": ", ".join(f'<{url}>; rel="{rel}"' for rel, url in links),
+            "X-Paging-Limit": str(page.limit),
+            "X-Paging-Since": page.since,
+            "X-Paging-Until": page.until,
+        },
+    )
+
+
+def resource_response(request, store, name, id_key):
+    resource = store.get(request.match_info.get(id_key))
+    if resource is None:
+        return web.json_response({"error": f"{name} not found"}, status=404)
+    return cached_json_response(
+        request,
+        request.app["app_state"].is04_cache,
+        (type(resource).__name__, resource.id),
+        resource.version,
+        resource.to_dict,
+    )
 
 
 async def sources_rest_api_handler(request):
-    return web.json_response([])
+    return resource_list_response(request, request.app["app_state"].sources, "sources")
 
 
 async def source_rest_api_handler(request):
-    return web.json_response({"error": "source not found"}, status=404)
+    return resource_response(
+        request, request.app["app_state"].sources, "source", "source_id"
+    )
 
 
 async def flows_rest_api_handler(request):
-    return web.json_response([])
+    return resource_list_response(request, request.app["app_state"].flows, "flows")
 
 
 async def flow_rest_api_handler(request):
-    return web.json_response({"error": "flow not found"}, status=404)
+    return resource_response(request, request.app["app_state"].flows, "flow", "flow_id")
 
 
 async def senders_rest_api_handler(request):
-    return web.json_response([])
+    return resource_list_response(request, request.app["app_state"].senders, "senders")
 
 
 async def sender_rest_api_handler(request):
-    return web.json_response({"error": "sender not found"}, status=404)
+    return resource_response(
+        request, request.app["app_state"].senders, "sender", "sender_id"
+    )
 
 
 async def receivers_rest_api_handler(request):
-    return web.json_response([])
+    return resource_list_response(
+        request, request.app["app_state"].receivers, "receivers"
+    )
 
 
 async def receiver_rest_api_handler(request):
-    return web.json_response({"error": "receiver not found"}, status=404)
+    return resource_response(
+        request, request.app["app_state"].receivers, "receiver", "receiver_id"
+    )
 
 
 async def devices_rest_api_handler(request):
     app_state = request.app["app_state"]
-    return web.json_response([app_state.device.to_dict()])
+    device = app_state.device
+    return cached_json_response(
+        request,
+        app_state.is04_cache,
+        "devices",
+        device.version,
+        lambda: [device.to_dict()],
+    )
 
 
 async def device_rest_api_handler(request):
     app_state = request.app["app_state"]
     device_id = request.match_info.get("device_id")
 
-    if device_id == app_state.device.id:
-        return web.json_response(app_state.device.to_dict())
+    device = app_state.device
+    if device_id == device.id:
+        return cached_json_response(
+            request,
+            app_state.is04_cache,
+            ("device", device.id),
+            device.version,
+            device.to_dict,
+        )
 
     return web.json_response({"error": "device not found"}, status=404)
 
 
+async def stats_handler(request):
+    # Read-only runtime statistics of the control side
+    app_state = request.app["app_state"]
+    registration = app_state.registration
+    return web.json_response(
+        {
+            "connections": app_state.connection_stats(),
+            "loop": app_state.loop_stats(),
+            "registration": registration.stats() if registration else None,
+        },
+        dumps=codec.dumps,
+    )
+
+
 # --- Main ---
 
 
+def is04_routes():
+    return [
+        # Base API endpoint
+        web.get("/x-nmos/node/v1.3", base_is_04_rest_api_handler),
+        web.get("/x-nmos/node/v1.3/", base_is_04_rest_api_handler),
+        # Self endpoint
+        web.get("/x-nmos/node/v1.3/self", node_self_rest_api_handler),
+        # Sources endpoints
+        web.get("/x-nmos/node/v1.3/sources", sources_rest_api_handler),
+        web.get("/x-nmos/node/v1.3/sources/", sources_rest_api_handler),
+        web.get("/x-nmos/node/v1.3/sources/{source_id}", source_rest_api_handler),
+        # Flows endpoints
+        web.get("/x-nmos/node/v1.3/flows", flows_rest_api_handler),
+        web.get("/x-nmos/node/v1.3/flows/", flows_rest_api_handler),
+        web.get("/x-nmos/node/v1.3/flows/{flow_id}", flow_rest_api_handler),
+        # Senders endpoints
+        web.get("/x-nmos/node/v1.3/senders", senders_rest_api_handler),
+        web.get("/x-nmos/node/v1.3/senders/", senders_rest_api_handler),
+        web.get("/x-nmos/node/v1.3/senders/{sender_id}", sender_rest_api_handler),
+        # Receivers endpoints
+        web.get("/x-nmos/node/v1.3/receivers", receivers_rest_api_handler),
+        web.get("/x-nmos/node/v1.3/receivers/", receivers_rest_api_handler),
+        web.get("/x-nmos/node/v1.3/receivers/{receiver_id}", receiver_rest_api_handler),
+        # Devices endpoints
+        web.get("/x-nmos/node/v1.3/devices", devices_rest_api_handler),
+        web.get("/x-nmos/node/v1.3/devices/", devices_rest_api_handler),
+        web.get("/x-nmos/node/v1.3/devices/{device_id}", device_rest_api_handler),
+    ]
+
+
+async def init_is04_app():
+    # Worker process app: read-only IS-04 resources from the app_state
+    # snapshot inherited at fork time, no control tree and no /ws
+    app = web.Application()
+    app["app_state"] = app_state
+    app.add_routes(is04_routes())
+    return app
+
+
 async def init_app():
     app = web.Application()
 
@@ -183,40 +518,12 @@ async def init_app():
     app["app_state"] = app_state
 
     await app_state.setup()
+    app.on_cleanup.append(lambda app: app["app_state"].close())
 
-    app.add_routes(
-        [
-            # Base API endpoint
-            web.get("/x-nmos/node/v1.3", base_is_04_rest_api_handler),
-            web.get("/x-nmos/node/v1.3/", base_is_04_rest_api_handler),
-            # Self endpoint
-            web.get("/x-nmos/node/v1.3/self", node_self_rest_api_handler),
-            # Sources endpoints
-            web.get("/x-nmos/node/v1.3/sources", sources_rest_api_handler),
-            web.get("/x-nmos/node/v1.3/sources/", sources_rest_api_handler),
-            web.get("/x-nmos/node/v1.3/sources/{source_id}", source_rest_api_handler),
-            # Flows endpoints
-            web.get("/x-nmos/node/v1.3/flows", flows_rest_api_handler),
-            web.get("/x-nmos/node/v1.3/flows/", flows_rest_api_handler),
-            web.get("/x-nmos/node/v1.3/flows/{flow_id}", flow_rest_api_handler),
-            # Senders endpoints
-            web.get("/x-nmos/node/v1.3/senders", senders_rest_api_handler),
-            web.get("/x-nmos/node/v1.3/senders/", senders_rest_api_handler),
-            web.get("/x-nmos/node/v1.3/senders/{sender_id}", sender_rest_api_handler),
-            # Receivers endpoints
-            web.get("/x-nmos/node/v1.3/receivers", receivers_rest_api_handler),
-            web.get("/x-nmos/node/v1.3/receivers/", receivers_rest_api_handler),
-            web.get(
-                "/x-nmos/node/v1.3/receivers/{receiver_id}", receiver_rest_api_handler
-            ),
-            # Devices endpoints
-            web.get("/x-nmos/node/v1.3/devices", devices_rest_api_handler),
-            web.get("/x-nmos/node/v1.3/devices/", devices_rest_api_handler),
-            web.get("/x-nmos/node/v1.3/devices/{device_id}", device_rest_api_handler),
-            # WebSocket endpoint
-            web.get("/ws", websocket_handler),
-        ]
-    )
+    app.add_routes(is04_routes())
+    # WebSocket endpoint
+    app.add_routes([web.get("/ws", websocket_handler)])
+    app.add_routes([web.get("/stats", stats_handler)])
 
     # Root block
     root = NcBlock(
@@ -265,7 +572,6 @@ async def init_app():
         ],
         runtime_property_constraints=None,
     )
-    root.add_member(device_manager)
 
     # Add NcClassManager
     class_manager = NcClassManager(
@@ -278,7 +584,6 @@ async def init_app():
         touchpoints=None,
         runtime_property_constraints=None,
     )
-    root.add_member(class_manager)
 
     # Child member
     obj1 = NcObject(
@@ -292,7 +597,6 @@ async def init_app():
         None,
         None,
     )
-    root.add_member(obj1)
 
     # Add NcWorker
     worker1 = NcWorker(
@@ -307,7 +611,6 @@ async def init_app():
         runtime_property_constraints=None,
         notifier=app_state.event_queue,
     )
-    root.add_member(worker1)
 
     # Child block
     child_block = NcBlock(
@@ -331,7 +634,6 @@ async def init_app():
         None,
         None,
     )
-    child_block.add_member(obj2)
 
     # Add NcWorker to child block
     worker2 = NcWorker(
@@ -346,14 +648,171 @@ async def init_app():
         runtime_property_constraints=None,
         notifier=app_state.event_queue,
     )
-    child_block.add_member(worker2)
+    child_block.add_members([obj2, worker2])
 
-    root.add_member(child_block)
+    root.add_members([device_manager, class_manager, obj1, worker1, child_block])
+    if app_state.role_index:
+        root.registry.enable_role_index()
 
     app_state.root_block = root
 
     return app
 
 
+async def run_owner(host, port, control_port):
+    # Owner process: shares the IS-04 port with the workers and alone
+    # listens on the control port that IS-12 controllers are sent to
+    runner = web.AppRunner(await init_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port, reuse_port=True).start()
+    await web.TCPSite(runner, host, control_port).start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+
+
+def run_workers(workers, host, port, control_port):
+    if not hasattr(os, "fork") or not hasattr(socket, "SO_REUSEPORT"):
+        raise SystemExit("Worker mode needs os.fork and SO_REUSEPORT")
+
+    # A /ws connection on the shared port could land in any process, so the
+    # IS-12 endpoint moves to the owner's own port before forking
+    app_state.device.controls[0].href = f"ws://127.0.0.1:{control_port}/ws"
+    app_state.device.bump_version()
+    app_state.resources_frozen = True
+
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                web.run_app(
+                    init_is04_app(), host=host, port=port, reuse_port=True, print=None
+                )
+            finally:
+                os._exit(0)
+        pids.append(pid)
+
+    try:
+        asyncio.run(run_owner(host, port, control_port))
+    finally:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in pids:
+            os.waitpid(pid, 0)
+
+
 if __name__ == "__main__":
-    web.run_app(init_app(), host="0.0.0.0", port=3000)
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="extra processes serving the IS-04 Node API on the shared port",
+    )
+    parser.add_argument(
+        "--control-port",
+        type=int,
+        default=3001,
+        help="port of the IS-12 WebSocket in worker mode",
+    )
+    parser.add_argument(
+        "--registry",
+        action="append",
+        default=[],
+        help="IS-04 registry base URL, repeat for failover registries",
+    )
+    parser.add_argument(
+        "--notification-window",
+        type=float,
+        default=None,
+        help="seconds to collect events for into one Notification message",
+    )
+    parser.add_argument(
+        "--notification-batch-size",
+        type=int,
+        default=256,
+        help="most events collected into one Notification message",
+    )
+    parser.add_argument(
+        "--max-pending-notifications",
+        type=int,
+        default=1024,
+        help="notifications queued per connection before the policy applies",
+    )
+    parser.add_argument(
+        "--slow-consumer-policy",
+        choices=(
+            SLOW_CONSUMER_DROP_OLDEST,
+            SLOW_CONSUMER_COALESCE,
+            SLOW_CONSUMER_DISCONNECT,
+        ),
+        default=SLOW_CONSUMER_DROP_OLDEST,
+        help="what happens when a connection's notification queue is full",
+    )
+    parser.add_argument(
+        "--coalesce-notifications",
+        action="store_true",
+        help="keep only the latest pending value per property and connection",
+    )
+    parser.add_argument(
+        "--concurrent-commands",
+        action="store_true",
+        help="run commands concurrently, in order per oid only",
+    )
+    parser.add_argument(
+        "--max-inflight-commands",
+        type=int,
+        default=64,
+        help="concurrent commands per connection before reads are held back",
+    )
+    parser.add_argument(
+        "--encode-offload-threshold",
+        type=int,
+        default=None,
+        help="encode values with at least this many items in worker threads",
+    )
+    parser.add_argument(
+        "--encode-workers",
+        type=int,
+        default=2,
+        help="threads encoding offloaded values",
+    )
+    parser.add_argument(
+        "--loop-lag-interval",
+        type=float,
+        default=None,
+        help="seconds between event loop lag samples, shown in /stats",
+    )
+    parser.add_argument(
+        "--role-index",
+        action="store_true",
+        help="answer FindMembersByRole from a device-wide role search index",
+    )
+    args = parser.parse_args()
+    app_state = AppState(
+        notification_window=args.notification_window,
+        notification_batch_size=args.notification_batch_size,
+        max_pending_notifications=args.max_pending_notifications,
+        slow_consumer_policy=args.slow_consumer_policy,
+        coalesce_notifications=args.coalesce_notifications,
+        concurrent_commands=args.concurrent_commands,
+        max_inflight_commands=args.max_inflight_commands,
+        encode_offload_threshold=args.encode_offload_threshold,
+        encode_workers=args.encode_workers,
+        loop_lag_interval=args.loop_lag_interval,
+        registry_urls=args.registry or None,
+        role_index=args.role_index,
+    )
+    if args.workers > 0:
+        run_workers(args.workers, "0.0.0.0", 3000, args.control_port)
+    else:
+        web.run_app(init_app(), host="0.0.0.0", port=3000)
@@ -1,9 +1,10 @@
 from __future__ import annotations
 import asyncio
-from typing import Any, List, Optional, TYPE_CHECKING
+from typing import Any, ClassVar, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
 
 from data_types import (
     ElementId,
+    JsonStream,
     NcMethodStatus,
     NcPropertyChangeType,
     NcClassDescriptor,
@@ -17,10 +18,30 @@ from data_types import (
 if TYPE_CHECKING:
     from data_types import NcEventDescriptor
 
-from nc_object import NcMember, NcObject
+from class_id_trie import ClassIdTrie
+from nc_object import NcMember, NcObject, PropertyAccessor, delegate_accessors
+from nc_registry import NcRegistry
+from role_index import role_matches
 
 
 class NcBlock(NcMember):
+    property_accessors: ClassVar[Dict[str, PropertyAccessor]] = {
+        **delegate_accessors(NcObject.property_accessors),
+        "enabled": lambda b: b.enabled,
+        "members": lambda b: b.generate_members_descriptors(),
+    }
+    __slots__ = (
+        "_member_positions",
+        "_members_descriptors",
+        "base",
+        "enabled",
+        "is_root",
+        "members",
+        "members_by_class_id",
+        "members_by_role",
+        "registry",
+    )
+
     def __init__(
         self,
         notifier,
@@ -49,6 +70,20 @@ class NcBlock(NcMember):
         self.is_root = is_root
         self.enabled = enabled
         self.members: List[NcMember] = []
+        # Descriptors of the members property, built on first use and
+        # dropped whenever membership or a member's role/userLabel changes
+        self._members_descriptors: Optional[List[dict]] = None
+        # role -> this block's members with that role, in member order.
+        # Chained through the nested blocks it is a role-path trie of the
+        # whole subtree
+        self.members_by_role: Dict[str, List[NcMember]] = {}
+        # Class id -> oids of this block's own members
+        self.members_by_class_id = ClassIdTrie()
+        # oid -> index in members, built on first use like the descriptors
+        self._member_positions: Optional[Dict[int, int]] = None
+        # Shared with the rest of the tree once this block is added to another
+        self.registry = NcRegistry()
+        self.registry.register(self)
 
     def member_type(self):
         return "NcBlock"
@@ -70,12 +105,7 @@ class NcBlock(NcMember):
 
     def get_property(self, oid, id_args):
         if oid == self.base.oid:
-            lvl, idx = id_args.id.level, id_args.id.index
-            if (lvl, idx) == (2, 1):
-                return NcMethodStatus.Ok, None, self.enabled
-            if (lvl, idx) == (2, 2):
-                return NcMethodStatus.Ok, None, self.generate_members_descriptors()
-            return self.base.get_property(oid, id_args)
+            return self.get_table_property(id_args)
         m = self.find_member(oid)
         return (
             m.get_property(oid, id_args)
@@ -85,19 +115,30 @@ class NcBlock(NcMember):
 
     def set_property(self, oid, id_args_value):
         if oid == self.base.oid:
-            return self.base.set_property(oid, id_args_value)
-        m = self.find_member(oid)
-        return (
-            m.set_property(oid, id_args_value)
-            if m
-            else (NcMethodStatus.BadOid, "Member not found", False)
-        )
+            result = self.base.set_property(oid, id_args_value)
+        else:
+            m = self.find_member(oid)
+            if not m:
+                return NcMethodStatus.BadOid, "Member not found", False
+            result = m.set_property(oid, id_args_value)
+        if (id_args_value.id.level, id_args_value.id.index) == (1, 6) and result[2]:
+            # A new userLabel shows in the owning block's member descriptors
+            owner = self.registry.owner_of(oid)
+            if owner is not None:
+                owner.invalidate_members_descriptors()
+        return result
 
     def invoke_method(self, oid, method_id, args):
         if oid == self.base.oid:
             lvl, idx = method_id.level, method_id.index
             if (lvl, idx) == (2, 1):  # 2m1
-                return NcMethodStatus.Ok, None, self.get_member_descriptors(args)
+                # Recursive results can be huge, let the caller encode lazily
+                recurse = args.get("recurse", False)
+                return (
+                    NcMethodStatus.Ok,
+                    None,
+                    JsonStream(self.iter_member_descriptors(recurse)),
+                )
             if (lvl, idx) == (2, 2):  # 2m2
                 return NcMethodStatus.Ok, None, self.find_members_by_path(args)
             if (lvl, idx) == (2, 3):  # 2m3
@@ -131,15 +172,19 @@ class NcBlock(NcMember):
                         None,
                     )
 
-                members = self.generate_members_descriptors()
-                if args["index"] >= len(members):
+                if args["index"] >= len(self.members):
                     return (
                         NcMethodStatus.IndexOutOfBounds,
                         f"Index {args['index']} out of bounds",
                         None,
                     )
 
-                return NcMethodStatus.Ok, None, members[args["index"]]
+                member = self.members[args["index"]]
+                return (
+                    NcMethodStatus.Ok,
+                    None,
+                    self.make_member_descriptor(member, self.base.get_oid()),
+                )
 
             # Handle GetSequenceLength (1m7) for members property (2p2)
             if (lvl, idx) == (1, 7):  # GetSequenceLength
@@ -157,8 +202,7 @@ class NcBlock(NcMember):
                 if level != 2 or index != 2:  # Not the members property (2p2)
                     return self.base.invoke_method(oid, method_id, args)
 
-                members = self.generate_members_descriptors()
-                return NcMethodStatus.Ok, None, len(members)
+                return NcMethodStatus.Ok, None, len(self.members)
 
             return self.base.invoke_method(oid, method_id, args)
 
@@ -170,7 +214,27 @@ class NcBlock(NcMember):
         )
 
     def add_member(self, member):
-        self.members.append(member)
+        self.add_members([member])
+
+    def add_members(self, members):
+        # Adds members in order with a single members notification, so
+        # building a block of N members stays O(N)
+        added = False
+        try:
+            for member in members:
+                self._register_member(member)
+                self.members.append(member)
+                self.members_by_role.setdefault(member.get_role(), []).append(member)
+                self.members_by_class_id.add(member.get_class_id(), member.get_oid())
+                added = True
+        finally:
+            # Members added before a failed registration stay added
+            if added:
+                self._members_changed()
+
+    def _members_changed(self):
+        self.invalidate_members_descriptors()
+        self._member_positions = None
         ev = make_event(
             self.base.oid,
             ElementId(2, 2),
@@ -179,29 +243,96 @@ class NcBlock(NcMember):
         )
         asyncio.create_task(self.base.notifier.put(ev))
 
-    def find_member(self, oid):
-        for m in self.members:
+    def remove_member(self, oid):
+        for i, m in enumerate(self.members):
             if m.get_oid() == oid:
-                return m
-            if isinstance(m, NcBlock):
-                found = m.find_member(oid)
-                if found:
-                    return found
-        return None
+                break
+        else:
+            return False
+        del self.members[i]
+        same_role = self.members_by_role[m.get_role()]
+        same_role.remove(m)
+        if not same_role:
+            del self.members_by_role[m.get_role()]
+        self.members_by_class_id.remove(m.get_class_id(), oid)
+        self._unregister_member(m)
+        self._members_changed()
+        return True
+
+    def rename_member(self, oid, role) -> bool:
+        # Roles are read-only to controllers, this is for the device itself
+        m = self.registry.find(oid)
+        if m is None or self.registry.owner_of(oid) is not self:
+            return False
+        old_role = m.get_role()
+        obj = m
+        while not isinstance(obj, NcObject):
+            obj = obj.base
+        obj.role = role
+
+        same_role = self.members_by_role[old_role]
+        same_role.remove(m)
+        if not same_role:
+            del self.members_by_role[old_role]
+        same_role = self.members_by_role.setdefault(role, [])
+        same_role.append(m)
+        if len(same_role) > 1:
+            same_role.sort(key=lambda x: self._position_of(x.get_oid()))
+        self.registry.role_changed(m)
+
+        asyncio.create_task(
+            obj._notify(ElementId(1, 5), NcPropertyChangeType.ValueChanged, role)
+        )
+        self._members_changed()
+        return True
 
-    def generate_members_descriptors(self):
-        return [
-            {
-                "role": m.get_role(),
-                "oid": m.get_oid(),
-                "constantOid": m.get_constant_oid(),
-                "classId": m.get_class_id(),
-                "userLabel": m.get_user_label() or "",
-                "description": None,
-                "owner": self.base.get_oid(),
+    def _position_of(self, oid):
+        if self._member_positions is None:
+            self._member_positions = {
+                m.get_oid(): i for i, m in enumerate(self.members)
             }
-            for m in self.members
-        ]
+        return self._member_positions[oid]
+
+    def _register_member(self, member):
+        if isinstance(member, NcBlock):
+            # Adopt the nested tree: fold its index into ours and share ours
+            nested = member.registry
+            self.registry.merge(nested)
+            for m in nested.members.values():
+                if isinstance(m, NcBlock):
+                    m.registry = self.registry
+        self.registry.register(member, self)
+
+    def _unregister_member(self, member):
+        self.registry.unregister(member.get_oid())
+        if isinstance(member, NcBlock):
+            # Give the detached tree its own index back. Owners come before
+            # their members in the walk, so each is registered in time
+            registry = NcRegistry()
+            registry.register(member)
+            member.registry = registry
+            for owner, m in member.walk_members():
+                self.registry.unregister(m.get_oid())
+                registry.register(m, registry.find(owner))
+                if isinstance(m, NcBlock):
+                    m.registry = registry
+
+    def find_member(self, oid):
+        m = self.registry.find(oid)
+        return None if m is self else m
+
+    def generate_members_descriptors(self):
+        if self._members_descriptors is None:
+            owner = self.base.get_oid()
+            self._members_descriptors = [
+                self.make_member_descriptor(m, owner) for m in self.members
+            ]
+        return self._members_descriptors
+
+    def invalidate_members_descriptors(self):
+        # Also needed after changing a member's role or userLabel directly
+        # rather than through set_property
+        self._members_descriptors = None
 
     @staticmethod
     def make_member_descriptor(member, owner):
@@ -217,15 +348,33 @@ class NcBlock(NcMember):
 
     # 2m1
     def get_member_descriptors(self, args):
-        recurse = args.get("recurse", False)
-        results = [
-            self.make_member_descriptor(m, self.base.get_oid()) for m in self.members
-        ]
-        if recurse:
-            for m in self.members:
-                if isinstance(m, NcBlock):
-                    results.extend(m.get_member_descriptors(args))
-        return results
+        return list(self.iter_member_descriptors(args.get("recurse", False)))
+
+    def walk_blocks(self):
+        # This block and every nested block, each before its own nested
+        # blocks and those in member order. Iterative, so the depth of the
+        # tree is not bounded by recursion
+        stack = [self]
+        while stack:
+            block = stack.pop()
+            yield block
+            stack.extend(m for m in reversed(block.members) if isinstance(m, NcBlock))
+
+    def walk_members(self):
+        # (owner oid, member) pairs of the whole subtree: this block's own
+        # members first, then each nested block's subtree in member order
+        for block in self.walk_blocks():
+            owner = block.base.get_oid()
+            for m in block.members:
+                yield owner, m
+
+    def iter_member_descriptors(self, recurse=False):
+        # Each block's cached descriptors, in walk_members order. The caches
+        # are replaced rather than changed when members change, so the dicts
+        # yielded stay as they were when read
+        blocks = self.walk_blocks() if recurse else (self,)
+        for block in blocks:
+            yield from block.generate_members_descriptors()
 
     @staticmethod
     def get_class_descriptor(include_inherited: bool = True) -> "NcClassDescriptor":
@@ -393,22 +542,30 @@ class NcBlock(NcMember):
         if not segments:
             return []
 
-        return self._find_members_by_path_recursive(segments)
-
-    def _find_members_by_path_recursive(self, segments):
-        if not segments:
-            return []
-
-        first, rest = segments[0], segments[1:]
-        results = []
+        return [
+            self.make_member_descriptor(m, owner.base.get_oid())
+            for owner, m in self._members_at_path(segments)
+        ]
 
-        for m in self.members:
-            if m.get_role() == first:
-                if not rest:
-                    results.append(self.make_member_descriptor(m, self.base.get_oid()))
-                elif isinstance(m, NcBlock):
-                    results.extend(m._find_members_by_path_recursive(rest))
-        return results
+    def resolve_role_path(self, path: Sequence[str]) -> Optional[NcMember]:
+        # The member at a role path relative to this block, the block itself
+        # for an empty path, or None
+        found = self._members_at_path(path)
+        return found[0][1] if found else None
+
+    def _members_at_path(self, path: Sequence[str]) -> List[Tuple[NcBlock, NcMember]]:
+        # (owner, member) pairs at a role path, one dict lookup per segment
+        level: List[Tuple[Any, NcMember]] = [(None, self)]
+        for role in path:
+            level = [
+                (block, m)
+                for _, block in level
+                if isinstance(block, NcBlock)
+                for m in block.members_by_role.get(role, ())
+            ]
+            if not level:
+                break
+        return level
 
     # 2m3
     def find_members_by_role(self, args):
@@ -420,27 +577,70 @@ class NcBlock(NcMember):
         match_whole = args.get("matchWholeString", False)
         recurse = args.get("recurse", False)
 
-        # Normalize search string
-        search_role = role if case_sensitive else role.lower()
+        role_index = self.registry.role_index
+        if role_index is not None:
+            found = role_index.search(role, case_sensitive, match_whole)
+            return self._descriptors_in_scan_order(found, recurse)
 
-        def matches(r: str) -> bool:
-            if not r:
-                return False
-            target = r if case_sensitive else r.lower()
-            return target == search_role if match_whole else search_role in target
+        if not case_sensitive:
+            role = role.lower()
+        # A block's members at a time, no per-member tuples to unpack
+        results = []
+        for block in self.walk_blocks() if recurse else (self,):
+            owner = block.base.get_oid()
+            results.extend(
+                [
+                    self.make_member_descriptor(m, owner)
+                    for m in block.members
+                    if role_matches(m.get_role(), role, case_sensitive, match_whole)
+                ]
+            )
+        return results
 
-        results = [
-            self.make_member_descriptor(m, self.base.get_oid())
-            for m in self.members
-            if matches(m.get_role())
+    def _descriptors_in_scan_order(self, oids, recurse):
+        # Descriptors of the given device-wide oids that are members of this
+        # block, or of its subtree when recursing, in the order scanning the
+        # tree from here finds them
+        if recurse and len(oids) * 4 >= len(self.registry):
+            # Much of the device matches: filtering a walk of the subtree
+            # costs less than sorting the matches into place
+            wanted = set(oids)
+            return [
+                self.make_member_descriptor(m, owner)
+                for owner, m in self.walk_members()
+                if m.get_oid() in wanted
+            ]
+        keyed = []
+        for oid in oids:
+            owner = self.registry.owner_of(oid)
+            if not recurse:
+                if owner is self:
+                    keyed.append(((0, self._position_of(oid)), oid, owner))
+                continue
+            key = self._scan_key(oid)
+            if key is not None:
+                keyed.append((key, oid, owner))
+        keyed.sort(key=lambda k: k[0])
+        return [
+            self.make_member_descriptor(self.registry.find(oid), owner.get_oid())
+            for _, oid, owner in keyed
         ]
 
-        if recurse:
-            for m in self.members:
-                if isinstance(m, NcBlock):
-                    results.extend(m.find_members_by_role(args))
-
-        return results
+    def _scan_key(self, oid):
+        # Sort key of a member in the recursive scan order from this block:
+        # a block's own members first, then each nested block's subtree in
+        # member order. None when the member is not below this block
+        parts = []
+        tag = 0
+        owner = self.registry.owner_of(oid)
+        while owner is not None:
+            parts.append((tag, owner._position_of(oid)))
+            if owner is self:
+                return tuple(reversed(parts))
+            tag = 1
+            oid = owner.get_oid()
+            owner = self.registry.owner_of(oid)
+        return None
 
     # 2m4
     def find_members_by_class_id(self, args):
@@ -451,25 +651,9 @@ class NcBlock(NcMember):
         recurse = args.get("recurse", False)
         include_derived = args.get("includeDerived", False)
 
-        class_id_str = ".".join(str(x) for x in class_id)
-
-        def matches_class_id(cid):
-            cid_str = ".".join(str(x) for x in cid)
-            return (
-                cid_str.startswith(class_id_str)
-                if include_derived
-                else cid_str == class_id_str
-            )
-
-        results = [
-            self.make_member_descriptor(m, self.base.get_oid())
-            for m in self.members
-            if matches_class_id(m.get_class_id())
-        ]
-
+        # Compared component by component, so 1.1 does not match 1.10
         if recurse:
-            for m in self.members:
-                if isinstance(m, NcBlock):
-                    results.extend(m.find_members_by_class_id(args))
-
-        return results
+            found = self.registry.class_ids.find(class_id, include_derived)
+        else:
+            found = self.members_by_class_id.find(class_id, include_derived)
+        return self._descriptors_in_scan_order(found, recurse)
@@ -1,9 +1,11 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional, TYPE_CHECKING
+from types import MappingProxyType
+from typing import Any, ClassVar, Dict, List, Mapping, Optional, Tuple, TYPE_CHECKING
 
 from data_types import (
     IdArgs,
     IdArgsValue,
+    JsonFragment,
     NcMethodStatus,
     NcDescriptor,
     NcDatatypeType,
@@ -25,13 +27,29 @@ if TYPE_CHECKING:
     )
 
 from nc_manager import NcManager
-from nc_object import NcMember, NcObject
+from nc_object import NcMember, NcObject, PropertyAccessor, delegate_accessors
 from nc_device_manager import NcDeviceManager
 from nc_block import NcBlock
 from nc_worker import NcWorker
 
 
 class NcClassManager(NcMember):
+    property_accessors: ClassVar[Dict[str, PropertyAccessor]] = {
+        **delegate_accessors(NcManager.property_accessors),
+        "controlClasses": lambda c: c._control_classes_json,
+        "datatypes": lambda c: c._datatypes_json,
+    }
+    __slots__ = (
+        "_control_class_items",
+        "_control_classes",
+        "_control_classes_inherited",
+        "_control_classes_json",
+        "_datatype_items",
+        "_datatypes",
+        "_datatypes_json",
+        "base",
+    )
+
     def __init__(
         self,
         notifier,
@@ -54,8 +72,20 @@ class NcClassManager(NcMember):
             touchpoints=touchpoints,
             runtime_property_constraints=runtime_property_constraints,
         )
-        self._control_classes = self._generate_class_descriptors()
+        # Class descriptors are static, so both variants are serialised once
+        self._control_classes = self._generate_class_descriptors(False)
+        self._control_classes_inherited = self._generate_class_descriptors(True)
         self._datatypes = self._generate_type_descriptors()
+        # controlClasses (3p1) and datatypes (3p2) never change, so they are
+        # kept encoded and spliced straight into command responses
+        self._control_class_items = [
+            JsonFragment.encode(desc) for desc in self._control_classes.values()
+        ]
+        self._control_classes_json = JsonFragment.join(self._control_class_items)
+        self._datatype_items = [
+            JsonFragment.encode(dtype.to_dict()) for dtype in self._datatypes.values()
+        ]
+        self._datatypes_json = JsonFragment.join(self._datatype_items)
 
     def member_type(self) -> str:
         return "NcClassManager"
@@ -69,7 +99,7 @@ class NcClassManager(NcMember):
     def get_constant_oid(self) -> bool:
         return self.base.get_constant_oid()
 
-    def get_class_id(self) -> List[int]:
+    def get_class_id(self) -> Tuple[int, ...]:
         return self.base.get_class_id()
 
     def get_user_label(self) -> Optional[str]:
@@ -79,20 +109,23 @@ class NcClassManager(NcMember):
     def _class_id_key(class_id: List[int]) -> str:
         return ".".join(str(x) for x in class_id)
 
-    def _generate_class_descriptors(self) -> Dict[str, dict]:
+    def _generate_class_descriptors(
+        self, include_inherited: bool
+    ) -> Mapping[str, dict]:
         reg: Dict[str, dict] = {}
 
-        def add(cls_id: List[int], desc_any):
-            reg[self._class_id_key(cls_id)] = desc_any
-
-        add([1], NcObject.get_class_descriptor(False).to_dict())
-        add([1, 1], NcBlock.get_class_descriptor(False).to_dict())
-        add([1, 2], NcWorker.get_class_descriptor(False).to_dict())
-        add([1, 3], NcManager.get_class_descriptor(False).to_dict())
-        add([1, 3, 1], NcDeviceManager.get_class_descriptor(False).to_dict())
-        add([1, 3, 2], NcClassManager.get_class_descriptor(False).to_dict())
+        for cls in (
+            NcObject,
+            NcBlock,
+            NcWorker,
+            NcManager,
+            NcDeviceManager,
+            NcClassManager,
+        ):
+            desc = cls.get_class_descriptor(include_inherited)
+            reg[self._class_id_key(desc.classId)] = desc.to_dict()
 
-        return reg
+        return MappingProxyType(reg)
 
     def _generate_type_descriptors(self) -> Dict[str, Any]:
         reg: Dict[str, Any] = {}
@@ -276,26 +309,7 @@ class NcClassManager(NcMember):
     def get_property(
         self, _oid: int, id_args: IdArgs
     ) -> tuple[NcMethodStatus, Optional[str], Any]:
-        lvl, idx = id_args.id.level, id_args.id.index
-        if lvl == 3:
-            if idx == 1:
-                return (
-                    NcMethodStatus.Ok,
-                    None,
-                    list(self._control_classes.values()),
-                )
-            if idx == 2:
-                return (
-                    NcMethodStatus.Ok,
-                    None,
-                    list(dtype.to_dict() for dtype in self._datatypes.values()),
-                )
-            return (
-                NcMethodStatus.PropertyNotImplemented,
-                "Could not find the property",
-                None,
-            )
-        return self.base.get_property(_oid, id_args)
+        return self.get_table_property(id_args)
 
     def set_property(
         self, _oid: int, id_args_value: IdArgsValue
@@ -332,25 +346,23 @@ class NcClassManager(NcMember):
 
             # Handle controlClasses (3p1)
             if level == 3 and index == 1:
-                control_classes = list(self._control_classes.values())
-                if args["index"] >= len(control_classes):
+                if args["index"] >= len(self._control_class_items):
                     return (
                         NcMethodStatus.IndexOutOfBounds,
                         f"Index {args['index']} out of bounds",
                         None,
                     )
-                return NcMethodStatus.Ok, None, control_classes[args["index"]]
+                return NcMethodStatus.Ok, None, self._control_class_items[args["index"]]
 
             # Handle datatypes (3p2)
             elif level == 3 and index == 2:
-                datatypes = [dtype.to_dict() for dtype in self._datatypes.values()]
-                if args["index"] >= len(datatypes):
+                if args["index"] >= len(self._datatype_items):
                     return (
                         NcMethodStatus.IndexOutOfBounds,
                         f"Index {args['index']} out of bounds",
                         None,
                     )
-                return NcMethodStatus.Ok, None, datatypes[args["index"]]
+                return NcMethodStatus.Ok, None, self._datatype_items[args["index"]]
 
             return NcMethodStatus.ParameterError, "Invalid property", None
 
@@ -381,55 +393,15 @@ class NcClassManager(NcMember):
             class_id = args.get("classId") or []
             include_inherited = bool(args.get("includeInherited", False))
 
-            if not include_inherited:
-                key = self._class_id_key(class_id)
-                desc = self._control_classes.get(key)
-                if not desc:
-                    return (
-                        NcMethodStatus.PropertyNotImplemented,
-                        "Class not found",
-                        None,
-                    )
-                return NcMethodStatus.Ok, None, desc
-
-            if class_id == [1]:
-                return (
-                    NcMethodStatus.Ok,
-                    None,
-                    NcObject.get_class_descriptor(True).to_dict(),
-                )
-            elif class_id == [1, 1]:
-                return (
-                    NcMethodStatus.Ok,
-                    None,
-                    NcBlock.get_class_descriptor(True).to_dict(),
-                )
-            elif class_id == [1, 2]:
-                return (
-                    NcMethodStatus.Ok,
-                    None,
-                    NcWorker.get_class_descriptor(True).to_dict(),
-                )
-            elif class_id == [1, 3]:
-                return (
-                    NcMethodStatus.Ok,
-                    None,
-                    NcManager.get_class_descriptor(True).to_dict(),
-                )
-            elif class_id == [1, 3, 1]:
-                return (
-                    NcMethodStatus.Ok,
-                    None,
-                    NcDeviceManager.get_class_descriptor(True).to_dict(),
-                )
-            elif class_id == [1, 3, 2]:
-                return (
-                    NcMethodStatus.Ok,
-                    None,
-                    NcClassManager.get_class_descriptor(True).to_dict(),
-                )
-            else:
+            control_classes = (
+                self._control_classes_inherited
+                if include_inherited
+                else self._control_classes
+            )
+            desc = control_classes.get(self._class_id_key(class_id))
+            if not desc:
                 return NcMethodStatus.PropertyNotImplemented, "Class not found", None
+            return NcMethodStatus.Ok, None, desc
 
         elif method_id.level == 3 and method_id.index == 2:
             name = args.get("name")
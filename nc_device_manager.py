@@ -1,6 +1,6 @@
 from __future__ import annotations
 import asyncio
-from typing import Any, List, Optional, TYPE_CHECKING
+from typing import Any, ClassVar, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 from data_types import (
     ElementId,
@@ -28,11 +28,38 @@ if TYPE_CHECKING:
         NcMethodDescriptor,
         NcEventDescriptor,
     )
-from nc_object import NcMember
+from nc_object import NcMember, PropertyAccessor, delegate_accessors
 from nc_manager import NcManager
 
 
 class NcDeviceManager(NcMember):
+    property_accessors: ClassVar[Dict[str, PropertyAccessor]] = {
+        **delegate_accessors(NcManager.property_accessors),
+        "ncVersion": lambda d: d.nc_version,
+        "manufacturer": lambda d: d.manufacturer.to_dict(),
+        "product": lambda d: d.product.to_dict(),
+        "serialNumber": lambda d: d.serial_number,
+        "userInventoryCode": lambda d: d.user_inventory_code,
+        "deviceName": lambda d: d.device_name,
+        "deviceRole": lambda d: d.device_role,
+        "operationalState": lambda d: d.operational_state.to_dict(),
+        "resetCause": lambda d: int(d.reset_cause),
+        "message": lambda d: d.message,
+    }
+    __slots__ = (
+        "base",
+        "device_name",
+        "device_role",
+        "manufacturer",
+        "message",
+        "nc_version",
+        "operational_state",
+        "product",
+        "reset_cause",
+        "serial_number",
+        "user_inventory_code",
+    )
+
     def __init__(
         self,
         notifier: asyncio.Queue,
@@ -84,7 +111,7 @@ class NcDeviceManager(NcMember):
     def get_constant_oid(self) -> bool:
         return self.base.get_constant_oid()
 
-    def get_class_id(self) -> List[int]:
+    def get_class_id(self) -> Tuple[int, ...]:
         return self.base.get_class_id()
 
     def get_user_label(self) -> Optional[str]:
@@ -93,36 +120,7 @@ class NcDeviceManager(NcMember):
     def get_property(
         self, _oid: int, id_args: IdArgs
     ) -> tuple[NcMethodStatus, Optional[str], Any]:
-        # properties at level 3 -> map indexes to fields
-        lvl, idx = id_args.id.level, id_args.id.index
-        if lvl == 3:
-            if idx == 1:
-                return NcMethodStatus.Ok, None, self.nc_version
-            if idx == 2:
-                return NcMethodStatus.Ok, None, self.manufacturer.to_dict()
-            if idx == 3:
-                return NcMethodStatus.Ok, None, self.product.to_dict()
-            if idx == 4:
-                return NcMethodStatus.Ok, None, self.serial_number
-            if idx == 5:
-                return NcMethodStatus.Ok, None, self.user_inventory_code
-            if idx == 6:
-                return NcMethodStatus.Ok, None, self.device_name
-            if idx == 7:
-                return NcMethodStatus.Ok, None, self.device_role
-            if idx == 8:
-                return NcMethodStatus.Ok, None, self.operational_state.to_dict()
-            if idx == 9:
-                return NcMethodStatus.Ok, None, int(self.reset_cause)
-            if idx == 10:
-                return NcMethodStatus.Ok, None, self.message
-            return (
-                NcMethodStatus.PropertyNotImplemented,
-                "Could not find the property",
-                None,
-            )
-        # fall back to base object
-        return self.base.get_property(_oid, id_args)
+        return self.get_table_property(id_args)
 
     def set_property(
         self, _oid: int, id_args_value: IdArgsValue
@@ -1,14 +1,17 @@
 from __future__ import annotations
-from typing import Any, Optional, List, TYPE_CHECKING
+from typing import Any, Optional, List, Tuple, TYPE_CHECKING
 
 from data_types import IdArgs, IdArgsValue, NcMethodStatus
-from nc_object import NcMember, NcObject
+from nc_object import NcMember, NcObject, delegate_accessors
 
 if TYPE_CHECKING:
     from data_types import NcClassDescriptor
 
 
 class NcManager(NcMember):
+    property_accessors = delegate_accessors(NcObject.property_accessors)
+    __slots__ = ("base",)
+
     def __init__(
         self,
         notifier,
@@ -45,7 +48,7 @@ class NcManager(NcMember):
     def get_constant_oid(self) -> bool:
         return self.base.get_constant_oid()
 
-    def get_class_id(self) -> List[int]:
+    def get_class_id(self) -> Tuple[int, ...]:
         return self.base.get_class_id()
 
     def get_user_label(self) -> Optional[str]:
@@ -54,7 +57,7 @@ class NcManager(NcMember):
     def get_property(
         self, oid: int, id_args: IdArgs
     ) -> tuple[NcMethodStatus, Optional[str], Any]:
-        return self.base.get_property(oid, id_args)
+        return self.get_table_property(id_args)
 
     def set_property(
         self, oid: int, id_args_value: IdArgsValue
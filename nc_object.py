@@ -1,7 +1,17 @@
 from __future__ import annotations
 import asyncio
 from abc import ABC, abstractmethod
-from typing import Any, List, Optional, TYPE_CHECKING
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TYPE_CHECKING,
+)
 
 from data_types import (
     ElementId,
@@ -29,8 +39,47 @@ if TYPE_CHECKING:
     )
     from data_types import make_event
 
+PropertyAccessor = Callable[[Any], Any]
+
+# (level, index) -> accessor, built once per class on first use
+_property_tables: Dict[type, Dict[Tuple[int, int], PropertyAccessor]] = {}
+
+# Every object of a class shares one class id tuple
+_class_ids: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+
+
+def intern_class_id(class_id: Sequence[int]) -> Tuple[int, ...]:
+    key = tuple(class_id)
+    return _class_ids.setdefault(key, key)
+
+
+def property_table(cls: Any) -> Dict[Tuple[int, int], PropertyAccessor]:
+    table = _property_tables.get(cls)
+    if table is None:
+        accessors = cls.property_accessors
+        table = {
+            (p.id.level, p.id.index): accessors[p.name]
+            for p in cls.get_class_descriptor(True).properties
+            if p.name in accessors
+        }
+        _property_tables[cls] = table
+    return table
+
+
+def delegate_accessors(
+    accessors: Dict[str, PropertyAccessor],
+) -> Dict[str, PropertyAccessor]:
+    # Accessors of the wrapped object, read through the wrapper's `base`
+    return {name: (lambda o, f=f: f(o.base)) for name, f in accessors.items()}
+
 
 class NcMember(ABC):
+    # Devices may hold 100k+ members, so no member carries a __dict__
+    __slots__ = ()
+
+    # Property name -> accessor, resolved against get_class_descriptor
+    property_accessors: ClassVar[Dict[str, PropertyAccessor]] = {}
+
     @abstractmethod
     def member_type(self) -> str:
         pass
@@ -48,7 +97,7 @@ class NcMember(ABC):
         pass
 
     @abstractmethod
-    def get_class_id(self) -> List[int]:
+    def get_class_id(self) -> Tuple[int, ...]:
         pass
 
     @abstractmethod
@@ -73,8 +122,48 @@ class NcMember(ABC):
     ) -> tuple[NcMethodStatus, Optional[str], Any]:
         pass
 
+    def get_table_property(
+        self, id_args: IdArgs
+    ) -> tuple[NcMethodStatus, Optional[str], Any]:
+        accessor = property_table(type(self)).get((id_args.id.level, id_args.id.index))
+        if accessor is None:
+            return (
+                NcMethodStatus.PropertyNotImplemented,
+                "Could not find the property",
+                None,
+            )
+        return NcMethodStatus.Ok, None, accessor(self)
+
 
 class NcObject(NcMember):
+    property_accessors: ClassVar[Dict[str, PropertyAccessor]] = {
+        "classId": lambda o: o.class_id,
+        "oid": lambda o: o.oid,
+        "constantOid": lambda o: o.constant_oid,
+        "owner": lambda o: o.owner,
+        "role": lambda o: o.role,
+        "userLabel": lambda o: o.user_label,
+        "touchpoints": lambda o: (
+            None if o.touchpoints is None else [tp.to_dict() for tp in o.touchpoints]
+        ),
+        "runtimePropertyConstraints": lambda o: (
+            None
+            if o.runtime_property_constraints is None
+            else [c.to_dict() for c in o.runtime_property_constraints]
+        ),
+    }
+    __slots__ = (
+        "class_id",
+        "constant_oid",
+        "notifier",
+        "oid",
+        "owner",
+        "role",
+        "runtime_property_constraints",
+        "touchpoints",
+        "user_label",
+    )
+
     def __init__(
         self,
         notifier,
@@ -87,7 +176,8 @@ class NcObject(NcMember):
         touchpoints: Optional[List[Any]],
         runtime_property_constraints: Optional[List[Any]],
     ):
-        self.class_id, self.oid, self.constant_oid = class_id, oid, constant_oid
+        self.class_id = intern_class_id(class_id)
+        self.oid, self.constant_oid = oid, constant_oid
         self.owner, self.role, self.user_label = owner, role, user_label
         self.touchpoints = touchpoints
         self.runtime_property_constraints = runtime_property_constraints
@@ -112,28 +202,7 @@ class NcObject(NcMember):
         return self.user_label
 
     def get_property(self, oid, id_args):
-        mapping = {
-            (1, 1): self.class_id,
-            (1, 2): self.oid,
-            (1, 3): self.constant_oid,
-            (1, 4): self.owner,
-            (1, 5): self.role,
-            (1, 6): self.user_label,
-            (1, 7): None
-            if self.touchpoints is None
-            else [tp.to_dict() for tp in self.touchpoints],
-            (1, 8): None
-            if self.runtime_property_constraints is None
-            else [c.to_dict() for c in self.runtime_property_constraints],
-        }
-        key = (id_args.id.level, id_args.id.index)
-        if key in mapping:
-            return NcMethodStatus.Ok, None, mapping[key]
-        return (
-            NcMethodStatus.PropertyNotImplemented,
-            "Could not find the property",
-            None,
-        )
+        return self.get_table_property(id_args)
 
     async def _notify(self, prop_id, change_type, value, seq_idx=None):
         await self.notifier.put(
@@ -0,0 +1,76 @@
+from __future__ import annotations
+from typing import Dict, Optional, TYPE_CHECKING
+
+from class_id_trie import ClassIdTrie
+from role_index import RoleIndex
+
+if TYPE_CHECKING:
+    from nc_block import NcBlock
+    from nc_object import NcMember
+
+
+# Device-wide oid -> member index shared by every block of a tree
+class NcRegistry:
+    def __init__(self):
+        self.members: Dict[int, NcMember] = {}
+        # oid -> the block holding it as a member, the root has none
+        self.owners: Dict[int, NcBlock] = {}
+        # Class id -> oids over the whole tree, for FindMembersByClassId
+        self.class_ids = ClassIdTrie()
+        # Role search index, kept only once enabled on the device's registry
+        self.role_index: Optional[RoleIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __contains__(self, oid: int) -> bool:
+        return oid in self.members
+
+    def register(self, member: NcMember, owner: Optional[NcBlock] = None) -> None:
+        oid = member.get_oid()
+        if oid in self.members and self.members[oid] is not member:
+            raise ValueError(f"Oid {oid} is already registered")
+        self.members[oid] = member
+        if owner is not None:
+            self.owners[oid] = owner
+        self.class_ids.add(member.get_class_id(), oid)
+        if self.role_index is not None:
+            self.role_index.add(oid, member.get_role())
+
+    def unregister(self, oid: int) -> Optional[NcMember]:
+        self.owners.pop(oid, None)
+        if self.role_index is not None:
+            self.role_index.remove(oid)
+        member = self.members.pop(oid, None)
+        if member is not None:
+            self.class_ids.remove(member.get_class_id(), oid)
+        return member
+
+    def find(self, oid: int) -> Optional[NcMember]:
+        return self.members.get(oid)
+
+    def owner_of(self, oid: int) -> Optional[NcBlock]:
+        return self.owners.get(oid)
+
+    def merge(self, other: NcRegistry) -> None:
+        for oid, member in other.members.items():
+            if oid in self.members and self.members[oid] is not member:
+                raise ValueError(f"Oid {oid} is already registered")
+        self.members.update(other.members)
+        self.owners.update(other.owners)
+        for oid, member in other.members.items():
+            self.class_ids.add(member.get_class_id(), oid)
+        if self.role_index is not None:
+            for oid, member in other.members.items():
+                self.role_index.add(oid, member.get_role())
+
+    def enable_role_index(self) -> RoleIndex:
+        if self.role_index is None:
+            self.role_index = RoleIndex()
+            for oid, member in self.members.items():
+                self.role_index.add(oid, member.get_role())
+        return self.role_index
+
+    def role_changed(self, member: NcMember) -> None:
+        if self.role_index is not None:
+            self.role_index.add(member.get_oid(), member.get_role())
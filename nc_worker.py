@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Any, List, Optional, TYPE_CHECKING
+from typing import Any, ClassVar, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 from data_types import (
     ElementId,
@@ -10,13 +10,19 @@ from data_types import (
     make_event,
 )
 
-from nc_object import NcMember, NcObject
+from nc_object import NcMember, NcObject, PropertyAccessor, delegate_accessors
 
 if TYPE_CHECKING:
     from data_types import NcClassDescriptor
 
 
 class NcWorker(NcMember):
+    property_accessors: ClassVar[Dict[str, PropertyAccessor]] = {
+        **delegate_accessors(NcObject.property_accessors),
+        "enabled": lambda w: w.enabled,
+    }
+    __slots__ = ("base", "enabled")
+
     def __init__(
         self,
         class_id: List[int],
@@ -55,7 +61,7 @@ class NcWorker(NcMember):
     def get_constant_oid(self) -> bool:
         return self.base.get_constant_oid()
 
-    def get_class_id(self) -> List[int]:
+    def get_class_id(self) -> Tuple[int, ...]:
         return self.base.get_class_id()
 
     def get_user_label(self) -> Optional[str]:
@@ -65,14 +71,7 @@ class NcWorker(NcMember):
         self, oid: int, id_args: IdArgs
     ) -> tuple[NcMethodStatus, Optional[str], Any]:
         if oid == self.base.oid:
-            # Handle NcWorker specific properties
-            if (
-                id_args.id.level == 2 and id_args.id.index == 1
-            ):  # 2.1 for enabled property
-                return NcMethodStatus.Ok, None, self.enabled
-
-            # Delegate to base class for other properties
-            return self.base.get_property(oid, id_args)
+            return self.get_table_property(id_args)
 
         return NcMethodStatus.BadOid, "Object not found", None
 
@@ -0,0 +1,96 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Optional
+
+import codec
+
+
+def payload_size(value: Any) -> int:
+    # Cheap stand-in for the encoded size: number of top level items
+    if isinstance(value, (list, tuple, dict)):
+        return len(value)
+    return 0 if value is None else 1
+
+
+# Encodes payloads of at least `threshold` items in a worker thread so the
+# event loop keeps serving other connections, smaller ones stay inline
+class EncodeOffload:
+    def __init__(self, threshold: Optional[int] = None, max_workers: int = 2):
+        self.threshold = threshold
+        self.max_workers = max_workers
+        self.inline_encodes = 0
+        self.offloaded_encodes = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def wants(self, size: int) -> bool:
+        return self.threshold is not None and size >= self.threshold
+
+    async def run(self, fn: Callable[..., str], *args) -> str:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="encode"
+            )
+        self.offloaded_encodes += 1
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, fn, *args
+        )
+
+    async def dumps(self, obj: Any, size: int) -> str:
+        if self.wants(size):
+            return await self.run(codec.dumps, obj)
+        self.inline_encodes += 1
+        return codec.dumps(obj)
+
+    def stats(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "inlineEncodes": self.inline_encodes,
+            "offloadedEncodes": self.offloaded_encodes,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# Samples how late the event loop wakes up a task sleeping for `interval`
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.05, max_samples: int = 1024):
+        self.interval = interval
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def stats(self) -> dict:
+        recent = sorted(self.samples)
+        if not recent:
+            return {"samples": 0, "meanLagMs": 0.0, "p99LagMs": 0.0, "maxLagMs": 0.0}
+        return {
+            "samples": len(recent),
+            "meanLagMs": sum(recent) / len(recent) * 1000,
+            "p99LagMs": recent[min(len(recent) - 1, int(len(recent) * 0.99))] * 1000,
+            "maxLagMs": self.max_lag * 1000,
+        }
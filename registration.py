@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import random
+from typing import Dict, Optional, Sequence, Tuple
+
+import aiohttp
+
+import codec
+from data_types import NmosResource
+
+logger = logging.getLogger(__name__)
+
+REGISTRATION_API = "/x-nmos/registration/v1.3"
+HEARTBEAT_INTERVAL = 5.0
+
+# (resource type, id) as the Registration API names them
+ResourceKey = Tuple[str, str]
+
+
+class RegistryError(Exception):
+    pass
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    # Full jitter, so a fleet of nodes losing the same registry does not
+    # come back at it in lockstep. The exponent is capped, as 2**attempt
+    # overflows a float after a long enough outage
+    return random.uniform(0, min(cap, base * 2 ** min(attempt, 32)))
+
+
+# Registers the node's resources with an IS-04 registry and keeps them alive
+# with heartbeats, failing over to the next registry when one stops answering
+class RegistrationClient:
+    def __init__(
+        self,
+        app_state,
+        registry_urls: Sequence[str],
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        max_connections: int = 16,
+        request_timeout: float = 5.0,
+    ):
+        if not registry_urls:
+            raise ValueError("At least one registry URL is needed")
+        self.app_state = app_state
+        self.registry_urls = [u.rstrip("/") for u in registry_urls]
+        self.heartbeat_interval = heartbeat_interval
+        self.max_connections = max_connections
+        self.request_timeout = request_timeout
+        self.current = 0
+        # What the current registry holds: (type, id) -> registered version
+        self.registered: Dict[ResourceKey, str] = {}
+        self.registrations = 0
+        self.deletions = 0
+        self.heartbeats = 0
+        self.failovers = 0
+        self.reconciliations = 0
+        self._changed = asyncio.Event()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def registry_url(self) -> str:
+        return self.registry_urls[self.current]
+
+    def stats(self) -> dict:
+        return {
+            "registry": self.registry_url,
+            "registered": len(self.registered),
+            "registrations": self.registrations,
+            "deletions": self.deletions,
+            "heartbeats": self.heartbeats,
+            "failovers": self.failovers,
+            "reconciliations": self.reconciliations,
+        }
+
+    def start(self):
+        # One keep-alive connection pool for every registry request
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            json_serialize=codec.dumps,
+        )
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def run(self):
+        attempt = 0
+        while True:
+            try:
+                await self.reconcile()
+                attempt = 0
+                await self.maintain()
+            except (
+                aiohttp.ClientError,
+                asyncio.exceptions.TimeoutError,  # not builtin before 3.11
+                RegistryError,
+            ) as e:
+                logger.warning("Registry %s failed: %s", self.registry_url, e)
+            except Exception:
+                # Nothing awaits this task, so anything else is logged and
+                # retried rather than silently ending registration
+                logger.exception("Registration with %s failed", self.registry_url)
+            # maintain() only ever returns by raising
+            self.failover()
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def failover(self):
+        # The next registry knows nothing about us, everything goes again
+        self.current = (self.current + 1) % len(self.registry_urls)
+        self.registered.clear()
+        self.failovers += 1
+
+    def mark_changed(self):
+        # Reconcile now rather than at the next heartbeat
+        self._changed.set()
+
+    async def maintain(self):
+        # Heartbeats on schedule, reconciling in between whenever marked
+        # changed and after every heartbeat
+        loop = asyncio.get_running_loop()
+        next_heartbeat = loop.time() + self.heartbeat_interval
+        while True:
+            timeout = next_heartbeat - loop.time()
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.exceptions.TimeoutError:  # not builtin before 3.11
+                    pass
+            if loop.time() >= next_heartbeat:
+                next_heartbeat = loop.time() + self.heartbeat_interval
+                await self.heartbeat()
+            self._changed.clear()
+            await self.reconcile()
+
+    async def heartbeat(self):
+        node_id = self.app_state.node.id
+        url = f"{self.registry_url}{REGISTRATION_API}/health/nodes/{node_id}"
+        async with self._session.post(url) as response:
+            if response.status == 404:
+                # The registry dropped the node, e.g. after a restart, so
+                # the next reconcile registers everything again
+                logger.info("Node unknown to %s, registering again", url)
+                self.registered.clear()
+                return
+            if response.status != 200:
+                raise RegistryError(f"Heartbeat returned {response.status}")
+        self.heartbeats += 1
+
+    async def reconcile(self):
+        # Diffs the local resources against what the registry holds. Only
+        # new or re-versioned resources are posted, tier by tier so parents
+        # go first, each tier in one concurrent batch. Resources gone
+        # locally are deleted afterwards, children first
+        tiers = self.app_state.registration_tiers()
+        local = set()
+        for resource_type, resources in tiers:
+            changed = []
+            for r in resources:
+                local.add((resource_type, r.id))
+                if self.registered.get((resource_type, r.id)) != r.version:
+                    changed.append(r)
+            await self._batch(self.register(resource_type, r) for r in changed)
+
+        for resource_type, _ in reversed(tiers):
+            stale = [
+                resource_id
+                for (t, resource_id) in self.registered
+                if t == resource_type and (t, resource_id) not in local
+            ]
+            await self._batch(self.unregister(resource_type, i) for i in stale)
+        self.reconciliations += 1
+
+    async def _batch(self, requests):
+        results = await asyncio.gather(*requests, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def register(self, resource_type: str, resource: NmosResource):
+        url = f"{self.registry_url}{REGISTRATION_API}/resource"
+        # The version posted, the resource may change while the POST is
+        # in flight and then has to be registered again
+        version = resource.version
+        body = {"type": resource_type, "data": resource.to_dict()}
+        async with self._session.post(url, json=body) as response:
+            if response.status not in (200, 201):
+                raise RegistryError(
+                    f"Registering {resource_type} {resource.id} returned "
+                    f"{response.status}"
+                )
+        self.registered[(resource_type, resource.id)] = version
+        self.registrations += 1
+
+    async def unregister(self, resource_type: str, resource_id: str):
+        url = f"{self.registry_url}{REGISTRATION_API}/resource"
+        async with self._session.delete(
+            f"{url}/{resource_type}s/{resource_id}"
+        ) as response:
+            if response.status not in (204, 404):
+                raise RegistryError(
+                    f"Deleting {resource_type} {resource_id} returned {response.status}"
+                )
+        self.registered.pop((resource_type, resource_id), None)
+        self.deletions += 1
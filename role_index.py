@@ -0,0 +1,79 @@
+from typing import Dict, Iterable, List, Set
+
+
+def trigrams(s: str) -> Set[str]:
+    return {s[i : i + 3] for i in range(len(s) - 2)}
+
+
+def role_matches(
+    role: str, search: str, case_sensitive: bool, match_whole: bool
+) -> bool:
+    # How FindMembersByRole (2m3) compares a member's role to the search.
+    # Callers lowercase the search once per query when not case sensitive
+    if not role:
+        return False
+    if not case_sensitive:
+        role = role.lower()
+    return role == search if match_whole else search in role
+
+
+# Device-wide role search index for FindMembersByRole: case-folded role ->
+# oids for whole-string searches, and trigram of the case-folded role -> oids
+# for substring searches. Case folding maps character by character, so the
+# candidates it gives are a superset for both case modes and are checked
+# with role_matches afterwards
+class RoleIndex:
+    def __init__(self):
+        self.roles: Dict[int, str] = {}
+        self.exact: Dict[str, Set[int]] = {}
+        self.trigrams: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.roles)
+
+    def add(self, oid: int, role: str) -> None:
+        if oid in self.roles:
+            self.remove(oid)
+        self.roles[oid] = role
+        folded = role.casefold()
+        self.exact.setdefault(folded, set()).add(oid)
+        for t in trigrams(folded):
+            self.trigrams.setdefault(t, set()).add(oid)
+
+    def remove(self, oid: int) -> None:
+        role = self.roles.pop(oid, None)
+        if role is None:
+            return
+        folded = role.casefold()
+        for index, keys in ((self.exact, (folded,)), (self.trigrams, trigrams(folded))):
+            for key in keys:
+                oids = index[key]
+                oids.discard(oid)
+                if not oids:
+                    del index[key]
+
+    def search(self, search: str, case_sensitive: bool, match_whole: bool) -> List[int]:
+        # Oids of every role matching the search, in no particular order
+        folded = search.casefold()
+        if not case_sensitive:
+            search = search.lower()
+        candidates: Iterable[int]
+        if match_whole:
+            candidates = self.exact.get(folded, ())
+        elif len(folded) >= 3:
+            sets = sorted(
+                (self.trigrams.get(t, set()) for t in trigrams(folded)), key=len
+            )
+            candidates = set(sets[0])
+            for oids in sets[1:]:
+                if not candidates:
+                    break
+                candidates &= oids
+        else:
+            # Too short for a trigram, every role is a candidate
+            candidates = self.roles
+        return [
+            oid
+            for oid in candidates
+            if role_matches(self.roles[oid], search, case_sensitive, match_whole)
+        ]
@@ -0,0 +1,101 @@
+import argparse
+import time
+from typing import Dict
+
+from aiohttp import web
+
+from registration import REGISTRATION_API
+
+RESOURCE_TYPES = ("node", "device", "source", "flow", "sender", "receiver")
+
+# The attribute naming the parent a resource must be registered after
+PARENTS = {
+    "device": ("node", "node_id"),
+    "source": ("device", "device_id"),
+    "flow": ("device", "device_id"),
+    "sender": ("device", "device_id"),
+    "receiver": ("device", "device_id"),
+}
+
+
+# Minimal in-memory IS-04 Registration API for testing registration,
+# heartbeats and failover offline. Not a registry to deploy
+class StandInRegistry:
+    def __init__(self):
+        self.resources: Dict[str, Dict[str, dict]] = {t: {} for t in RESOURCE_TYPES}
+        self.last_heartbeat: Dict[str, float] = {}
+        self.requests = 0
+        # Cleared to simulate an outage: every request then gets a 503
+        self.available = True
+
+    def __len__(self) -> int:
+        return sum(len(r) for r in self.resources.values())
+
+    def clear(self):
+        for resources in self.resources.values():
+            resources.clear()
+        self.last_heartbeat.clear()
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._availability])
+        app.add_routes(
+            [
+                web.post(f"{REGISTRATION_API}/resource", self.post_resource),
+                web.delete(
+                    f"{REGISTRATION_API}/resource/{{plural}}/{{resource_id}}",
+                    self.delete_resource,
+                ),
+                web.post(
+                    f"{REGISTRATION_API}/health/nodes/{{node_id}}", self.heartbeat
+                ),
+            ]
+        )
+        return app
+
+    @web.middleware
+    async def _availability(self, request, handler):
+        self.requests += 1
+        if not self.available:
+            return web.json_response({"error": "registry unavailable"}, status=503)
+        return await handler(request)
+
+    async def post_resource(self, request):
+        body = await request.json()
+        resource_type, data = body.get("type"), body.get("data")
+        if resource_type not in self.resources or not isinstance(data, dict):
+            return web.json_response({"error": "invalid resource"}, status=400)
+        if resource_type in PARENTS:
+            parent_type, attribute = PARENTS[resource_type]
+            if data.get(attribute) not in self.resources[parent_type]:
+                return web.json_response(
+                    {"error": f"{parent_type} not registered"}, status=400
+                )
+        existing = data["id"] in self.resources[resource_type]
+        self.resources[resource_type][data["id"]] = data
+        if resource_type == "node":
+            self.last_heartbeat[data["id"]] = time.monotonic()
+        return web.json_response(data, status=200 if existing else 201)
+
+    async def delete_resource(self, request):
+        resource_type = request.match_info["plural"].rstrip("s")
+        resources = self.resources.get(resource_type)
+        if (
+            resources is None
+            or resources.pop(request.match_info["resource_id"], None) is None
+        ):
+            return web.json_response({"error": "resource not found"}, status=404)
+        return web.Response(status=204)
+
+    async def heartbeat(self, request):
+        node_id = request.match_info["node_id"]
+        if node_id not in self.resources["node"]:
+            return web.json_response({"error": "node not registered"}, status=404)
+        self.last_heartbeat[node_id] = time.monotonic()
+        return web.json_response({"health": str(int(time.time()))})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8235)
+    args = parser.parse_args()
+    web.run_app(StandInRegistry().make_app(), host="0.0.0.0", port=args.port)
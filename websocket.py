@@ -1,81 +1,404 @@
-import json
+import asyncio
+import inspect
+import logging
 import uuid
-from aiohttp import web, WSMsgType
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from aiohttp import web, WSCloseCode, WSMsgType
 
+import codec
 from data_types import (
     ElementId,
     IdArgs,
     IdArgsValue,
+    JsonFragment,
+    JsonStream,
     NcMethodStatus,
+    NcPropertyChangeType,
     MESSAGE_TYPE_COMMAND,
     MESSAGE_TYPE_COMMAND_RESPONSE,
     MESSAGE_TYPE_ERROR,
+    MESSAGE_TYPE_NOTIFICATION,
     MESSAGE_TYPE_SUBSCRIPTION,
     MESSAGE_TYPE_SUBSCRIPTION_RESPONSE,
 )
+from offload import payload_size
 
+logger = logging.getLogger(__name__)
 
-class CustomEncoder(json.JSONEncoder):
-    def default(self, o):
-        # IntEnum -> numeric value
-        from enum import IntEnum
-        from dataclasses import asdict
+# What to do with a notification when a connection's queue is full
+SLOW_CONSUMER_DROP_OLDEST = "drop-oldest"
+SLOW_CONSUMER_COALESCE = "coalesce"
+SLOW_CONSUMER_DISCONNECT = "disconnect"
 
-        if isinstance(o, IntEnum):
-            return int(o)
-        # dataclasses -> asdict
-        if hasattr(o, "__dataclass_fields__"):
-            return asdict(o)
-        # ElementId as dict
-        if isinstance(o, ElementId):
-            return {"level": o.level, "index": o.index}
-        # Generic fallback to asdict for objects with __dict__
-        if hasattr(o, "__dict__"):
-            return asdict(o)
-        return super().default(o)
+# Items of a streamed sequence encoded between two yields to the event loop
+STREAM_CHUNK_SIZE = 256
+
+# (oid, property level, property index)
+PropertyKey = Tuple[int, int, int]
+# [property key, change type, encoded event]
+PendingNotification = List[Any]
 
 
 class ConnectionState:
-    def __init__(self, ws):
+    def __init__(
+        self,
+        ws,
+        max_pending_notifications: int = 1024,
+        slow_consumer_policy: str = SLOW_CONSUMER_DROP_OLDEST,
+        coalesce_values: bool = False,
+        offload=None,
+        max_inflight_commands: int = 64,
+    ):
         self.websocket, self.subscribed_oids = ws, set()
+        self.max_pending_notifications = max_pending_notifications
+        self.slow_consumer_policy = slow_consumer_policy
+        self.coalesce_values = coalesce_values
+        self.offload = offload
+        # Encoded notifications waiting for this connection's writer task
+        self.pending_notifications: Deque[PendingNotification] = deque()
+        # Property -> its pending ValueChanged, while no sequence item event
+        # for the same property was queued after it
+        self._pending_values: Dict[PropertyKey, PendingNotification] = {}
+        self.sent_notifications = 0
+        self.dropped_notifications = 0
+        self.coalesced_notifications = 0
+        self.max_queue_depth = 0
+        self._wakeup = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._disconnecting = False
+        # Concurrent command mode: oid -> completion of its latest command
+        self._oid_tails: Dict[Any, asyncio.Future] = {}
+        self._command_tasks: Set[asyncio.Task] = set()
+        # Taken by the read loop for each scheduled command, so a client
+        # cannot queue more work than this before its reads are held back
+        self._command_slots = asyncio.Semaphore(max_inflight_commands)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.pending_notifications)
+
+    def stats(self) -> dict:
+        return {
+            "queueDepth": self.queue_depth,
+            "maxQueueDepth": self.max_queue_depth,
+            "sentNotifications": self.sent_notifications,
+            "droppedNotifications": self.dropped_notifications,
+            "coalescedNotifications": self.coalesced_notifications,
+        }
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_notifications())
+
+    async def stop(self):
+        for task in list(self._command_tasks):
+            task.cancel()
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
 
     async def send_text(self, text):
         if not self.websocket.closed:
             await self.websocket.send_str(text)
 
+    async def schedule_command(self, cmd, root_block):
+        # Commands for the same oid run in arrival order, all others run
+        # concurrently and each response is sent as soon as it is ready.
+        # Waits while the connection has too many commands in flight
+        await self._command_slots.acquire()
+        key = cmd.get("oid") if isinstance(cmd.get("oid"), int) else None
+        previous = self._oid_tails.get(key)
+        done = asyncio.get_running_loop().create_future()
+        self._oid_tails[key] = done
+        task = asyncio.create_task(
+            self._run_command(cmd, root_block, key, previous, done)
+        )
+        self._command_tasks.add(task)
+        task.add_done_callback(self._command_tasks.discard)
 
-async def process_command(msg, root_block):
-    responses = []
-    for cmd in msg.get("commands", []):
-        handle, oid, args = cmd.get("handle"), cmd.get("oid"), cmd.get("arguments")
-        method_id = ElementId(**cmd.get("methodId", {}))
-        status, error, value = NcMethodStatus.Ok, None, None
-
+    async def _run_command(self, cmd, root_block, key, previous, done):
         try:
-            if (method_id.level, method_id.index) == (1, 1):
-                st, err, val = root_block.get_property(
-                    oid, IdArgs(ElementId(**args["id"]))
-                )
-                status, error, value = st, err, val
-            elif (method_id.level, method_id.index) == (1, 2):
-                st, err, ok = root_block.set_property(
-                    oid, IdArgsValue(ElementId(**args["id"]), args.get("value"))
+            if previous is not None:
+                await asyncio.wait((previous,))
+            response = await execute_command(cmd, root_block)
+            await self.send_text(
+                await command_response_text(
+                    {
+                        "messageType": MESSAGE_TYPE_COMMAND_RESPONSE,
+                        "responses": [response],
+                    },
+                    offload=self.offload,
                 )
-                status = st
-                if not ok:
-                    error = err or "Set property failed"
-            else:
-                st, err, resp = root_block.invoke_method(oid, method_id, args)
-                status, error, value = st, err, resp
+            )
         except Exception as e:
-            status, error = NcMethodStatus.DeviceError, str(e)
+            # Nothing awaits this task: the peer went away mid-send
+            logger.warning("Could not send command response: %s", e)
+        finally:
+            self._command_slots.release()
+            done.set_result(None)
+            if self._oid_tails.get(key) is done:
+                del self._oid_tails[key]
+
+    def queue_notification(self, ev, text: str):
+        # Never blocks: a slow consumer only ever delays its own queue
+        prop_id = ev.event_data.property_id
+        key = (ev.oid, prop_id.level, prop_id.index)
+        change_type = ev.event_data.change_type
+        if self.coalesce_values:
+            if change_type == NcPropertyChangeType.ValueChanged:
+                pending = self._pending_values.get(key)
+                if pending is not None:
+                    # Only the latest value is worth sending
+                    pending[2] = text
+                    self.coalesced_notifications += 1
+                    return
+            else:
+                # Later values must not jump ahead of this sequence item event
+                self._pending_values.pop(key, None)
+        full = len(self.pending_notifications) >= self.max_pending_notifications
+        if full and not self._make_room():
+            return
+        entry = [key, change_type, text]
+        self.pending_notifications.append(entry)
+        if self.coalesce_values and change_type == NcPropertyChangeType.ValueChanged:
+            self._pending_values[key] = entry
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        self._wakeup.set()
+
+    def _make_room(self) -> bool:
+        if self.slow_consumer_policy == SLOW_CONSUMER_DISCONNECT:
+            self.dropped_notifications += 1
+            if not self._disconnecting:
+                self._disconnecting = True
+                asyncio.create_task(
+                    self.websocket.close(
+                        code=WSCloseCode.POLICY_VIOLATION, message=b"Slow consumer"
+                    )
+                )
+            return False
+        if self.slow_consumer_policy == SLOW_CONSUMER_COALESCE:
+            self._coalesce_pending()
+            if len(self.pending_notifications) < self.max_pending_notifications:
+                return True
+        key, _, _ = entry = self.pending_notifications.popleft()
+        if self._pending_values.get(key) is entry:
+            del self._pending_values[key]
+        self.dropped_notifications += 1
+        return True
+
+    def _coalesce_pending(self):
+        # Keep only the latest ValueChanged per property, it carries the whole
+        # value; sequence item events all stay, in order
+        kept: Deque[PendingNotification] = deque()
+        latest = set()
+        for entry in reversed(self.pending_notifications):
+            key, change_type, _ = entry
+            if change_type == NcPropertyChangeType.ValueChanged:
+                if key in latest:
+                    if self._pending_values.get(key) is entry:
+                        del self._pending_values[key]
+                    self.dropped_notifications += 1
+                    continue
+                latest.add(key)
+            kept.appendleft(entry)
+        self.pending_notifications = kept
+
+    async def _write_notifications(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self.pending_notifications:
+                continue
+            # Everything that piled up during the previous send goes out as
+            # one Notification message
+            notifications = [text for _, _, text in self.pending_notifications]
+            self.pending_notifications.clear()
+            self._pending_values.clear()
+            try:
+                if self.websocket.closed:
+                    raise ConnectionResetError("Connection closed")
+                await self.websocket.send_str(encode_notification(notifications))
+            except Exception:
+                self.dropped_notifications += len(notifications)
+                continue
+            self.sent_notifications += len(notifications)
+
+
+class SubscriptionIndex:
+    # oid -> subscribed connections, so fan-out only visits interested ones
+    def __init__(self):
+        self.connections_by_oid: Dict[int, Set[ConnectionState]] = {}
+
+    def subscribe(self, conn: ConnectionState, oids: Iterable[int]):
+        # A Subscription message replaces any previous subscriptions
+        self.unsubscribe(conn)
+        conn.subscribed_oids = set(oids)
+        for oid in conn.subscribed_oids:
+            self.connections_by_oid.setdefault(oid, set()).add(conn)
+
+    def unsubscribe(self, conn: ConnectionState):
+        for oid in conn.subscribed_oids:
+            subscribers = self.connections_by_oid.get(oid)
+            if subscribers is not None:
+                subscribers.discard(conn)
+                if not subscribers:
+                    del self.connections_by_oid[oid]
+
+    def subscribers(self, oid: int) -> Set[ConnectionState]:
+        return self.connections_by_oid.get(oid, set())
 
-        if status == NcMethodStatus.Ok:
-            result_obj = {"status": int(status), "value": value}
-            responses.append({"handle": handle, "result": result_obj})
+
+async def stream_command_response(msg, chunk_size=STREAM_CHUNK_SIZE, offload=None):
+    # Streamed sequences, already walked by execute_command, are encoded a
+    # chunk at a time, yielding to the event loop in between. Their chunks go
+    # straight into the message parts, so the encoded sequence is only copied
+    # by the final join. Pre-encoded values are spliced in as-is. With an
+    # offload stage, large values are encoded in its worker pool
+    parts = [f'{{"messageType":{msg["messageType"]},"responses":[']
+    for i, response in enumerate(msg["responses"]):
+        if i:
+            parts.append(",")
+        value = response["result"].get("value")
+        if isinstance(value, JsonStream):
+            parts.append(_response_head(response) + "[")
+            seen = 0
+            for chunk in _chunks(value.items, chunk_size):
+                if seen:
+                    parts.append(",")
+                seen += len(chunk)
+                if offload is not None and offload.wants(seen):
+                    parts.append(await offload.run(_encode_chunk, chunk))
+                else:
+                    parts.append(_encode_chunk(chunk))
+                    await asyncio.sleep(0)
+            parts.append("]}}")
+            continue
+        if (
+            offload is not None
+            and "value" in response["result"]
+            and not isinstance(value, JsonFragment)
+        ):
+            size = payload_size(value)
+            if offload.wants(size):
+                value = JsonFragment(await offload.dumps(value, size))
+        parts.append(_encode_response(response, value))
+    parts.append("]}")
+    return "".join(parts)
+
+
+async def command_response_text(msg, offload=None):
+    # stream_command_response, answering every command with a DeviceError
+    # when its response cannot be encoded
+    try:
+        return await stream_command_response(msg, offload=offload)
+    except Exception as e:
+        logger.exception("Could not encode command response")
+        return _encode_responses(
+            msg,
+            [
+                codec.dumps(
+                    {
+                        "handle": response["handle"],
+                        "result": {
+                            "status": int(NcMethodStatus.DeviceError),
+                            "errorMessage": f"Could not encode the response: {e}",
+                        },
+                    }
+                )
+                for response in msg["responses"]
+            ],
+        )
+
+
+def _chunks(items, chunk_size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _encode_chunk(chunk):
+    # Encoded items of a sequence chunk, without the surrounding brackets
+    if all(isinstance(item, JsonFragment) for item in chunk):
+        return ",".join(item.text for item in chunk)
+    return codec.dumps(chunk)[1:-1]
+
+
+def _response_head(response):
+    # A response's text up to its value
+    handle = codec.dumps(response["handle"])
+    return f'{{"handle":{handle},"result":{{"status":{response["result"]["status"]},"value":'
+
+
+def _encode_response(response, value):
+    if isinstance(value, JsonFragment):
+        return _response_head(response) + value.text + "}}"
+    return codec.dumps(response)
+
+
+def _encode_responses(msg, responses):
+    joined = ",".join(responses)
+    return f'{{"messageType":{msg["messageType"]},"responses":[{joined}]}}'
+
+
+def encode_notification(notifications):
+    # Notifications are passed in already encoded, one string per event
+    joined = ",".join(notifications)
+    return f'{{"messageType":{MESSAGE_TYPE_NOTIFICATION},"notifications":[{joined}]}}'
+
+
+async def execute_command(cmd, root_block):
+    handle, oid, args = cmd.get("handle"), cmd.get("oid"), cmd.get("arguments")
+    status, error, value = NcMethodStatus.Ok, None, None
+
+    try:
+        # A malformed methodId is answered like any other failing command
+        method_id = ElementId(**cmd.get("methodId", {}))
+        if (method_id.level, method_id.index) == (1, 1):
+            st, err, val = root_block.get_property(oid, IdArgs(ElementId(**args["id"])))
+            status, error, value = st, err, val
+        elif (method_id.level, method_id.index) == (1, 2):
+            st, err, ok = root_block.set_property(
+                oid, IdArgsValue(ElementId(**args["id"]), args.get("value"))
+            )
+            status = st
+            if not ok:
+                error = err or "Set property failed"
         else:
-            error_obj = {"status": int(status), "errorMessage": error}
-            responses.append({"handle": handle, "result": error_obj})
+            result = root_block.invoke_method(oid, method_id, args)
+            # Slow methods may return an awaitable instead of blocking
+            if inspect.isawaitable(result):
+                result = await result
+            st, err, resp = result
+            status, error, value = st, err, resp
+        if isinstance(value, JsonStream):
+            # Walk the tree now: the response reflects the state right after
+            # this command, whatever runs while it is encoded, and errors in
+            # the walk become a DeviceError. The walk only collects references
+            # to each block's cached descriptors, encoding is left to stream
+            value = JsonStream(list(value.items))
+    except Exception as e:
+        status, error = NcMethodStatus.DeviceError, str(e)
+
+    if status == NcMethodStatus.Ok:
+        result_obj = {"status": int(status), "value": value}
+        return {"handle": handle, "result": result_obj}
+    error_obj = {"status": int(status), "errorMessage": error}
+    return {"handle": handle, "result": error_obj}
+
+
+async def process_command(msg, root_block):
+    responses = []
+    for cmd in msg.get("commands", []):
+        responses.append(await execute_command(cmd, root_block))
     return {"messageType": MESSAGE_TYPE_COMMAND_RESPONSE, "responses": responses}
 
 
@@ -83,18 +406,27 @@ async def websocket_handler(request):
     app_state = request.app["app_state"]
     ws = web.WebSocketResponse()
     await ws.prepare(request)
-    conn_id, conn = str(uuid.uuid4()), ConnectionState(ws)
+    conn_id = str(uuid.uuid4())
+    conn = ConnectionState(
+        ws,
+        app_state.max_pending_notifications,
+        app_state.slow_consumer_policy,
+        app_state.coalesce_notifications,
+        app_state.encode_offload,
+        app_state.max_inflight_commands,
+    )
     app_state.connections[conn_id] = conn
+    conn.start()
 
     try:
         async for msg in ws:
             if msg.type != WSMsgType.TEXT:
                 continue
             try:
-                data = json.loads(msg.data)
+                data = codec.loads(msg.data)
             except Exception:
                 await conn.send_text(
-                    json.dumps(
+                    codec.dumps(
                         {
                             "messageType": MESSAGE_TYPE_ERROR,
                             "status": 400,
@@ -113,7 +445,7 @@ async def websocket_handler(request):
                 )
                 if invalid:
                     await conn.send_text(
-                        json.dumps(
+                        codec.dumps(
                             {
                                 "messageType": MESSAGE_TYPE_ERROR,
                                 "status": 400,
@@ -122,16 +454,20 @@ async def websocket_handler(request):
                         )
                     )
                     continue
+                if app_state.concurrent_commands:
+                    for cmd in data["commands"]:
+                        await conn.schedule_command(cmd, app_state.root_block)
+                    continue
                 await conn.send_text(
-                    json.dumps(
+                    await command_response_text(
                         await process_command(data, app_state.root_block),
-                        cls=CustomEncoder,
+                        offload=conn.offload,
                     )
                 )
             elif mt == MESSAGE_TYPE_SUBSCRIPTION and "subscriptions" in data:
-                conn.subscribed_oids = set(data["subscriptions"])
+                app_state.subscriptions.subscribe(conn, data["subscriptions"])
                 await conn.send_text(
-                    json.dumps(
+                    codec.dumps(
                         {
                             "messageType": MESSAGE_TYPE_SUBSCRIPTION_RESPONSE,
                             "subscriptions": list(conn.subscribed_oids),
@@ -140,7 +476,7 @@ async def websocket_handler(request):
                 )
             else:
                 await conn.send_text(
-                    json.dumps(
+                    codec.dumps(
                         {
                             "messageType": MESSAGE_TYPE_ERROR,
                             "status": 400,
@@ -149,5 +485,7 @@ async def websocket_handler(request):
                     )
                 )
     finally:
+        app_state.subscriptions.unsubscribe(conn)
         app_state.connections.pop(conn_id, None)
+        await conn.stop()
     return ws